@@ -15,7 +15,10 @@ from ai_helper import AiHelper
 from helpers.cli_helper_functions import flag_non_working_models, flag_file_capable_models
 from helpers.llm_info_provider import LLMInfoProvider
 from helpers.usage_tracker import UsageTracker, format_usage_data
-from helpers.test_helpers_utils import test_hello_world, test_weather, test_file_analysis
+from helpers.test_helpers_utils import test_hello_world, test_weather, test_file_analysis, HELLO_WORLD_PROMPT, \
+    FILE_ANALYSIS_PROMPT, FILE_ANALYSIS_FILE
+from py_models.hello_world.model import Hello_worldModel
+from py_models.file_analysis.model import FileAnalysisModel
 
 
 # check command line flags
@@ -36,6 +39,24 @@ parser.add_argument('--process_cv', nargs='*', help='Process CV with agentic wor
 parser.add_argument('--vv', action='store_true', help='Enable verbose debug logging to logs/forensics.log')
 args = parser.parse_args()
 
+
+def run_for_all_models(prompt: str, pydantic_model, file=None, provider='open_router'):
+    """Runs the same request against every usable model concurrently and prints the results"""
+    models = LLMInfoProvider().get_models()
+    requests = [{'prompt': prompt, 'pydantic_model': pydantic_model, 'llm_model_name': model,
+                 'provider': provider, 'file': file} for model in models]
+    results = AiHelper().get_results(requests)
+
+    for model, outcome in zip(models, results):
+        print(f"Model: {model}")
+        if isinstance(outcome, Exception):
+            print(f"Error with model {model}: {outcome}")
+            continue
+        result, report = outcome
+        print(result.model_dump_json(indent=4))
+        print(report.model_dump_json(indent=4))
+
+
 # Setup forensics logging if --vv flag is present
 if args.vv:
     # Ensure logs directory exists
@@ -86,12 +107,7 @@ if args.simple_test is not None:
 
 if args.test_tools is not None:
     if 'all' in args.test_tools:
-        info = LLMInfoProvider()
-        for model in info.get_models():
-            result, report = test_hello_world(model_name=model)
-            print(f"Model: {model}")
-            print(result.model_dump_json(indent=4))
-            print(report.model_dump_json(indent=4))
+        run_for_all_models(HELLO_WORLD_PROMPT, Hello_worldModel)
     else:
         result, report = test_weather()
         print(result.model_dump_json(indent=4))
@@ -99,11 +115,7 @@ if args.test_tools is not None:
 
 if args.test_file is not None:
     if 'all' in args.test_file:
-        info = LLMInfoProvider()
-        for model in info.get_models():
-            result, report = test_file_analysis(model_name=model)
-            print(result.model_dump_json(indent=4))
-            print(report.model_dump_json(indent=4))
+        run_for_all_models(FILE_ANALYSIS_PROMPT, FileAnalysisModel, file=FILE_ANALYSIS_FILE)
     else:
         result, report = test_file_analysis()
         print(result.model_dump_json(indent=4))
@@ -142,8 +154,7 @@ if args.prices_save is not None:
 if args.test_fallback is not None:
     # Test fallback functionality
     print("Testing fallback functionality...")
-    from py_models.hello_world.model import Hello_worldModel
-    
+
     ai_helper = AiHelper()
     
     try:
@@ -153,10 +164,11 @@ if args.test_fallback is not None:
             llm_model_name='invalid/non-existent-model',
             provider='invalid_provider'
         )
+        report_data = report.model_dump(include={'model_name', 'fallback_used', 'attempted_models'})
         print("✅ Fallback test successful!")
-        print(f"Final model used: {report.model_name}")
-        print(f"Fallback was used: {getattr(report, 'fallback_used', 'N/A')}")
-        print(f"Attempted models: {getattr(report, 'attempted_models', 'N/A')}")
+        print(f"Final model used: {report_data['model_name']}")
+        print(f"Fallback was used: {report_data['fallback_used']}")
+        print(f"Attempted models: {report_data['attempted_models']}")
         print(f"Result: {result.model_dump_json(indent=2)}")
         
     except Exception as e:
@@ -1,6 +1,8 @@
 """Base classes for all agents"""
 from typing import Optional, Union, Dict, TypeVar, Tuple, Any, Type
 from pathlib import Path
+import copy
+import functools
 import yaml
 import json
 
@@ -9,6 +11,15 @@ import sys
 sys.path.append(str(Path(__file__).parent.parent.parent))
 from py_models.base import BasePyModel, T
 
+FALLBACK_CONFIG_KEYS = ('fallback_model', 'fallback_provider', 'fallback_chain')
+
+
+@functools.lru_cache(maxsize=8)
+def _load_agents_yaml(config_path: Path, mtime_ns: int) -> Dict:
+    """Workflows create several agents from the same file, parse it once while it is unchanged"""
+    with open(config_path, 'r') as f:
+        return yaml.safe_load(f) or {}
+
 
 class AgentBase:
     """Base class for all agents with improved configuration management"""
@@ -17,15 +28,20 @@ class AgentBase:
         self.ai_helper = ai_helper
         self.agent_name = agent_name
         self.config = self._load_config(agent_name, config_override)
+        # Fallback settings don't change between runs, build them once
+        self.agent_config = {key: self.config[key] for key in FALLBACK_CONFIG_KEYS if key in self.config} or None
+        # The configured system prompt is the same for every run, only the prompt after it changes
+        system_prompt = self.config.get('system_prompt', '')
+        self.prompt_prefix = f"{system_prompt}\n\n" if system_prompt else ''
 
     def _load_config(self, agent_name: str, config_override: Optional[Dict] = None) -> Dict:
         """Load agent configuration from YAML file with override support"""
         config_path = Path(f"src/agents/config/agents.yaml")
         
         if config_path.exists():
-            with open(config_path, 'r') as f:
-                all_configs = yaml.safe_load(f)
-                config = all_configs.get('agents', {}).get(agent_name, {})
+            all_configs = _load_agents_yaml(config_path, config_path.stat().st_mtime_ns)
+            # Copied as overrides are applied to it
+            config = copy.deepcopy(all_configs.get('agents', {}).get(agent_name, {}))
         else:
             config = {}
         
@@ -44,29 +60,13 @@ class AgentBase:
         model_name = model_name or self.config.get('default_model')
         provider = provider or self.config.get('default_provider')
         
-        # Add system prompt if configured
-        system_prompt = self.config.get('system_prompt', '')
-        if system_prompt:
-            full_prompt = f"{system_prompt}\n\n{prompt}"
-        else:
-            full_prompt = prompt
-
-        # Prepare agent config for fallback support
-        agent_config = {}
-        if 'fallback_model' in self.config:
-            agent_config['fallback_model'] = self.config['fallback_model']
-        if 'fallback_provider' in self.config:
-            agent_config['fallback_provider'] = self.config['fallback_provider']
-        if 'fallback_chain' in self.config:
-            agent_config['fallback_chain'] = self.config['fallback_chain']
-
         result, report = await self.ai_helper.get_result_async(
-            prompt=full_prompt,
+            prompt=self.prompt_prefix + prompt,
             pydantic_model=pydantic_model,
             llm_model_name=model_name,
             file=file_path,
             provider=provider,
-            agent_config=agent_config if agent_config else None,
+            agent_config=self.agent_config,
             **kwargs
         )
 
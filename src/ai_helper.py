@@ -1,50 +1,404 @@
-from typing import Any, Optional, Union, TypeVar, Tuple, List
+from typing import Any, Optional, Union, TypeVar, Tuple, List, AsyncIterator, NamedTuple
 from datetime import datetime
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import hashlib
+import importlib
+import sys
+import threading
 import uuid
+import weakref
 import mimetypes
 import logging
 import os
 import time
 import traceback
+import typing
 from pathlib import Path
+from types import SimpleNamespace
 
-from pydantic_ai import Agent
+import httpx
+
+from pydantic import Field, create_model
+from pydantic_ai import Agent, NativeOutput, Tool, ToolOutput
 from pydantic_ai.agent import AgentRunResult
 from pydantic_ai.messages import ModelResponse, ToolCallPart, BinaryContent
 from pydantic_ai import capture_run_messages, UnexpectedModelBehavior
-from pydantic_ai.models.openai import OpenAIModel
-from pydantic_ai.models.anthropic import AnthropicModel
-from pydantic_ai.models.google import GoogleModel
-from pydantic_ai.providers.openai import OpenAIProvider
-from pydantic_ai.providers.anthropic import AnthropicProvider
-from pydantic_ai.providers.google import GoogleProvider
-from pydantic_ai.providers.openrouter import OpenRouterProvider
+from pydantic_ai.usage import Usage
 from dotenv import load_dotenv
 import os
 
 from helpers.llm_info_provider import LLMInfoProvider
 from helpers.usage_tracker import UsageTracker
 from helpers.config_helper import ConfigHelper
+from helpers.identity_cache import IdentityCache
+from helpers.image_utils import shrink_image
+from helpers.llm_cache import LLMCache, get_disk_cache
+from helpers.yaml_output import yaml_instructions, yaml_output
+from helpers import anthropic_batch, gemini_batch, openai_batch
 from py_models.base import LLMReport
 
 load_dotenv()
+logger = logging.getLogger(__name__)
 T = TypeVar('T', bound='BasePyModel')
 
+RESPONSE_FORMATS = ('json', 'yaml', 'native')
+
+
+class FallbackModel(NamedTuple):
+    """One entry of a fallback chain, model names are stored without the provider prefix (except open_router)"""
+    model: str
+    provider: str
+
+
+class FallbackError(Exception):
+    """Every model in the fallback chain failed, last_error is the error of the last one"""
+
+    def __init__(self, attempted_models: List[str], last_error: Optional[BaseException]):
+        super().__init__(attempted_models, last_error)
+        self.attempted_models = attempted_models
+        self.last_error = last_error
+
+    def __str__(self) -> str:
+        return f"All fallback models failed. Attempted: {self.attempted_models}. Last error: {self.last_error}"
+
+MAX_CACHED_AGENTS = 64
+
+try:
+    import h2  # noqa: F401 - httpx needs it for HTTP/2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Model and provider classes pull in their vendor SDK (openai, anthropic, google-genai), which dominates
+# import time, so they are only imported once a provider is actually used
+LAZY_CLASSES = {
+    'CachedOpenAIModel': 'helpers.cached_openai_model',
+    'CachedGoogleModel': 'helpers.cached_google_model',
+    'CachedAnthropicModel': 'helpers.cached_anthropic_model',
+    'OpenAIProvider': 'pydantic_ai.providers.openai',
+    'AnthropicProvider': 'pydantic_ai.providers.anthropic',
+    'GoogleProvider': 'pydantic_ai.providers.google',
+    'OpenRouterProvider': 'pydantic_ai.providers.openrouter',
+}
+
+# Providers that accept our own httpx client, google-genai takes it through its own client
+HTTP_CLIENT_PROVIDERS = ('OpenAIProvider', 'AnthropicProvider', 'OpenRouterProvider')
+GENAI_CLIENT_PROVIDERS = ('GoogleProvider',)
+
+
+def __getattr__(name: str):
+    if name not in LAZY_CLASSES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(LAZY_CLASSES[name]), name)
+    globals()[name] = value
+    return value
+
+
+def _resolve_class(class_or_name):
+    # Looked up on the module so patched classes are picked up
+    if isinstance(class_or_name, str):
+        return getattr(sys.modules[__name__], class_or_name)
+    return class_or_name
+
+
+# Pooled connections are bound to the event loop that opened them, so every loop gets its own client
+# and the providers and models holding it. Entries go away with their loop
+_http_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+_provider_instances: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+_model_instances: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def _current_loop() -> asyncio.AbstractEventLoop:
+    """The running loop, otherwise the thread's event loop that run_sync and _run_sync run on"""
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    try:
+        return asyncio.get_event_loop()
+    except RuntimeError:
+        event_loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(event_loop)
+        return event_loop
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    """
+    One pooled client for all providers on the current event loop. Batch runs keep many requests
+    in flight, so the pool keeps more idle connections alive than the httpx default, and HTTP/2
+    multiplexes requests over a single connection when h2 is installed. Idle connections are kept
+    for 30s instead of httpx's 5s, agent workflows and tool calls often leave a provider idle for
+    longer than that between requests. Timeouts match pydantic-ai's defaults.
+    """
+    event_loop = _current_loop()
+    http_client = _http_clients.get(event_loop)
+    if http_client is None:
+        http_client = _http_clients[event_loop] = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32, keepalive_expiry=30),
+            timeout=httpx.Timeout(timeout=600, connect=5)
+        )
+    return http_client
+
+
+# Retries of rate limited (429) and failed (5xx) requests before moving on in the fallback chain,
+# overridden by AI_HELPER_MAX_RETRIES. Same as the openai and anthropic SDK default
+DEFAULT_MAX_RETRIES = 2
+# Longest wait between Gemini retries, the openai and anthropic SDKs cap their backoff the same way
+MAX_RETRY_DELAY_SECONDS = 8
+
+
+def _get_max_retries() -> int:
+    return int(os.getenv('AI_HELPER_MAX_RETRIES', DEFAULT_MAX_RETRIES))
+
+
+def _get_provider_instance(provider_class, api_key: Optional[str]):
+    """Providers own the HTTP client, so sharing them keeps connections alive across AiHelper instances"""
+    providers = _provider_instances.setdefault(_current_loop(), {})
+    provider = providers.get((provider_class, api_key))
+    if provider is None:
+        provider = providers[(provider_class, api_key)] = _create_provider_instance(provider_class, api_key)
+    return provider
+
+
+def _create_provider_instance(provider_class, api_key: Optional[str]):
+    class_name = getattr(provider_class, '__name__', None)
+    if class_name in HTTP_CLIENT_PROVIDERS:
+        provider = provider_class(api_key=api_key, http_client=_get_http_client())
+        # The SDK retries with jittered exponential backoff and honours Retry-After
+        provider.client.max_retries = _get_max_retries()
+        return provider
+    # Without a key the provider raises its own configuration error
+    if class_name in GENAI_CLIENT_PROVIDERS and api_key:
+        return provider_class(client=_create_genai_client(api_key))
+    return provider_class(api_key=api_key)
+
+
+@functools.lru_cache(maxsize=4)
+def _get_openai_sync_client(api_key: Optional[str]):
+    """Batch calls are a few blocking uploads and polls, so they use the sync client, built on first use"""
+    from openai import OpenAI
+    return OpenAI(api_key=api_key)
+
+
+@functools.lru_cache(maxsize=4)
+def _get_anthropic_sync_client(api_key: Optional[str]):
+    from anthropic import Anthropic
+    return Anthropic(api_key=api_key)
+
+
+def _create_genai_client(api_key: str):
+    """
+    google-genai client on the shared pool, the SDK would otherwise open its own connections. Unlike
+    the openai and anthropic SDKs it never retries by default, so a single 429 or 503 would fail the
+    model, it gets the same retries with jittered backoff.
+    """
+    from google import genai
+    from google.genai.types import HttpOptions, HttpRetryOptions
+    from pydantic_ai.models import get_user_agent
+
+    retry_options = HttpRetryOptions(attempts=_get_max_retries() + 1, max_delay=MAX_RETRY_DELAY_SECONDS)
+    return genai.Client(api_key=api_key, http_options=HttpOptions(
+        headers={'User-Agent': get_user_agent()}, httpx_async_client=_get_http_client(),
+        retry_options=retry_options))
+
+
+def _get_model_instance(model_class, model_name: str, provider):
+    """Models only hold their name, profile and provider, so one instance serves every request to that model"""
+    models = _model_instances.setdefault(_current_loop(), {})
+    model = models.get((model_class, model_name, provider))
+    if model is None:
+        model = models[(model_class, model_name, provider)] = model_class(model_name, provider=provider)
+    return model
+
+
+def _in_running_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+@functools.lru_cache(maxsize=1)
+def _get_background_loop() -> asyncio.AbstractEventLoop:
+    """
+    Loop for sync calls made from inside a running event loop (notebooks, async frameworks),
+    where run_until_complete can't nest
+    """
+    event_loop = asyncio.new_event_loop()
+    threading.Thread(target=event_loop.run_forever, name='ai-helper-loop', daemon=True).start()
+    return event_loop
+
+
+def _run_sync(coroutine):
+    """
+    Runs a coroutine on the thread's event loop, the same one pydantic-ai's run_sync uses. Pooled
+    async HTTP connections are bound to their loop, asyncio.run would close it after every batch.
+    """
+    if _in_running_loop():
+        return asyncio.run_coroutine_threadsafe(coroutine, _get_background_loop()).result()
+
+    return _current_loop().run_until_complete(coroutine)
+
+
+# Common attachment types, resolved without initializing the mimetypes database
+EXTENSION_MIME_TYPES = {
+    '.pdf': 'application/pdf',
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.gif': 'image/gif',
+    '.webp': 'image/webp',
+    '.txt': 'text/plain',
+    '.md': 'text/markdown',
+    '.json': 'application/json',
+}
+
+
+def get_mime_type(file_path: Union[str, Path]) -> str:
+    file_path = str(file_path)
+    mime_type = EXTENSION_MIME_TYPES.get(os.path.splitext(file_path)[1].lower())
+    return mime_type or mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
+
+
+# Threads loading the attachments of one request
+MAX_FILE_LOAD_WORKERS = 8
+
+# Attachments above this are read per request, the caches would otherwise keep several of them in memory
+MAX_CACHED_FILE_BYTES = 20 * 1024 * 1024
+
+
+def _read_binary_content(file_path: Path) -> BinaryContent:
+    data, media_type = shrink_image(file_path.read_bytes(), get_mime_type(file_path))
+    return BinaryContent(data=data, media_type=media_type)
+
+
+@functools.lru_cache(maxsize=8)
+def _load_binary_content(file_path: Path, mtime_ns: int, size: int) -> BinaryContent:
+    """Batch runs send the same file to every model, so read it once while it is unchanged"""
+    return _read_binary_content(file_path)
+
+
+def _get_binary_content(file_path: Path, mtime_ns: int, size: int) -> BinaryContent:
+    if size > MAX_CACHED_FILE_BYTES:
+        return _read_binary_content(file_path)
+    return _load_binary_content(file_path, mtime_ns, size)
+
+
+def _load_file(file: Union[str, Path]) -> BinaryContent:
+    file_path = Path(file)
+    if not file_path.exists():
+        raise FileNotFoundError(f"File not found: {file}")
+
+    stat = file_path.stat()
+    return _get_binary_content(file_path, stat.st_mtime_ns, stat.st_size)
+
+
+# Attachment digests for cache keys. Loaded files are shared between requests, so each one is only hashed once
+_FILE_DIGEST_CACHE_SIZE = 32
+_file_digest_cache = IdentityCache(_FILE_DIGEST_CACHE_SIZE)
+
+
+def _get_file_digest(binary_content: BinaryContent) -> str:
+    if len(binary_content.data) > MAX_CACHED_FILE_BYTES:
+        return hashlib.sha256(binary_content.data).hexdigest()
+    return _file_digest_cache.get_or_build((binary_content,), None,
+                                           lambda: hashlib.sha256(binary_content.data).hexdigest())
+
+
+# Tool schemas are built by reflecting over the function signature and docstring, do it once per function
+_tool_cache: dict = {}
+
+
+def _prepare_tools(tools: list) -> list:
+    prepared = []
+    for tool in tools:
+        if isinstance(tool, Tool):
+            prepared.append(tool)
+            continue
+        if tool not in _tool_cache:
+            _tool_cache[tool] = Tool(tool)
+        prepared.append(_tool_cache[tool])
+    return prepared
+
+
+def _returns_output_model(tool, pydantic_model) -> bool:
+    """Plain tool functions annotated to return the requested output model"""
+    if isinstance(tool, Tool):
+        return False
+    try:
+        return_type = typing.get_type_hints(tool).get('return')
+    except Exception:
+        return False
+    return isinstance(return_type, type) and issubclass(return_type, pydantic_model)
+
+
+@functools.lru_cache(maxsize=64)
+def _packed_model(pydantic_model):
+    """Output model for packed requests, one per output model so its agent is reused"""
+    return create_model(f"{pydantic_model.__name__}Results",
+                        results=(List[pydantic_model], Field(description="One result per request, in request order")))
+
+
+def _pack_prompts(prompts: List[str]) -> str:
+    sections = [f"### Request {index}\n{prompt}" for index, prompt in enumerate(prompts, start=1)]
+    return (f"Answer each of the following {len(prompts)} requests separately and independently. Return "
+            f"exactly {len(prompts)} results, in the same order as the requests.\n\n" + "\n\n".join(sections))
+
+
+def _split_report(report: LLMReport, share: float, request_share: float, response_share: float) -> LLMReport:
+    """Packed requests only report usage for the whole request, each result gets its share"""
+    usage = report.usage or Usage()
+    request_tokens = round((usage.request_tokens or 0) * request_share)
+    response_tokens = round((usage.response_tokens or 0) * response_share)
+    return report.model_copy(update={
+        'usage': Usage(requests=usage.requests, request_tokens=request_tokens, response_tokens=response_tokens,
+                       total_tokens=request_tokens + response_tokens),
+        'cost': report.cost * share,
+    })
+
+
+def _supports_native_output(llm_provider, tools: list) -> bool:
+    if not llm_provider.profile.supports_json_schema_output:
+        return False
+    # Gemini rejects a response schema together with tools
+    return not (tools and llm_provider.system.startswith('google'))
+
+
+# Requests in flight at once for batches, overridden by AI_HELPER_MAX_CONCURRENCY
+DEFAULT_MAX_CONCURRENCY = 4
+
+# Fallback chains kept per primary model and agent config
+MAX_CACHED_FALLBACK_CHAINS = 256
+
 
 class AiHelper:
     def __init__(self):
-        self.info_provider = LLMInfoProvider()
-        self.usage_tracker = UsageTracker()
-        self.config_helper = ConfigHelper()
-
         # Provider configs
         self.providers = {
-            'openai': (OpenAIModel, OpenAIProvider, 'OPENAI_API_KEY'),
-            'anthropic': (AnthropicModel, AnthropicProvider, 'ANTHROPIC_API_KEY'),
-            'google': (GoogleModel, GoogleProvider, 'GOOGLE_API_KEY'),
-            'open_router': (OpenAIModel, OpenRouterProvider, 'OPEN_ROUTER_API_KEY')
+            'openai': ('CachedOpenAIModel', 'OpenAIProvider', 'OPENAI_API_KEY'),
+            'anthropic': ('CachedAnthropicModel', 'AnthropicProvider', 'ANTHROPIC_API_KEY'),
+            'google': ('CachedGoogleModel', 'GoogleProvider', 'GOOGLE_API_KEY'),
+            'open_router': ('CachedOpenAIModel', 'OpenRouterProvider', 'OPEN_ROUTER_API_KEY')
         }
         
+        # Agents keyed by output type, tools and response format. Agents hold no per-run state,
+        # so they are reused across requests and models
+        self._agents = IdentityCache(MAX_CACHED_AGENTS)
+        self._fallback_chains = IdentityCache(MAX_CACHED_FALLBACK_CHAINS)
+        # In-flight attachment loads, shared by concurrent requests for the same file
+        self._pending_loads: dict = {}
+        # In-flight cacheable requests by cache key, shared by identical concurrent requests
+        self._pending_results: dict = {}
+
+        # Response cache for identical requests, opt-in via AI_HELPER_CACHE=true (in memory) or disk
+        self.cache = self._create_cache(os.getenv('AI_HELPER_CACHE', 'false').lower())
+        # Requests in flight at once for get_results batches
+        self.max_concurrency = int(os.getenv('AI_HELPER_MAX_CONCURRENCY', DEFAULT_MAX_CONCURRENCY))
+
         # Setup debug logging
         self.debug_enabled = os.getenv('AI_HELPER_DEBUG', 'false').lower() == 'true'
         if self.debug_enabled:
@@ -52,224 +406,529 @@ class AiHelper:
         else:
             self.logger = None
 
+    @staticmethod
+    def _create_cache(mode: str) -> Optional[LLMCache]:
+        if mode == 'true':
+            return LLMCache()
+        if mode == 'disk':
+            return get_disk_cache(os.path.join(os.path.dirname(__file__), '../logs/llm_cache'))
+        return None
+
+    # Helpers read models.json, usage.json and config.json (and may hit the network),
+    # so they are only created once a request actually needs them
+    @functools.cached_property
+    def info_provider(self) -> LLMInfoProvider:
+        return LLMInfoProvider()
+
+    @functools.cached_property
+    def usage_tracker(self) -> UsageTracker:
+        return UsageTracker()
+
+    @functools.cached_property
+    def config_helper(self) -> ConfigHelper:
+        return ConfigHelper()
+
     """
     This is the main sync method we use
     """
     def get_result(self, prompt: str, pydantic_model, llm_model_name: str = 'deepseek/deepseek-prover-v2:free',
-                   file: Optional[Union[str, Path]] = None, provider='open_router', tools: list = None,
-                   agent_config: Optional[dict] = None) -> Tuple[T, LLMReport] | Tuple[None, None]:
-        if '/' not in llm_model_name:
-            raise ValueError(f"Model name '{llm_model_name}' must be in the format 'provider/model_name'.")
+                   file: Optional[Union[str, Path, List[Union[str, Path]]]] = None, provider='open_router', tools: list = None,
+                   agent_config: Optional[dict] = None,
+                   response_format: str = 'json') -> Tuple[T, LLMReport] | Tuple[None, None]:
+        self._validate_request(prompt, file, llm_model_name, response_format)
+
+        # Called from async code the blocking run can't use the caller's loop, it goes through the async path
+        if _in_running_loop():
+            return _run_sync(self.get_result_async(prompt, pydantic_model, llm_model_name, file, provider, tools,
+                                                   agent_config, response_format))
 
         tools = tools or []
         user_prompt = self._prepare_prompt(prompt, file)
+        cache_key = self._get_cache_key(user_prompt, pydantic_model, llm_model_name, provider, tools)
+        cached_result = self._get_cached_result(cache_key)
+        if cached_result:
+            return cached_result
+
         fallback_models = self._build_fallback_chain(llm_model_name, provider, agent_config)
 
-        return self._execute_with_fallback(user_prompt, pydantic_model, fallback_models, tools)
+        result = self._execute_with_fallback(user_prompt, pydantic_model, fallback_models, tools, response_format)
+        self._store_cached_result(cache_key, result)
+        return result
+
+    @staticmethod
+    def _validate_request(prompt: str, file, llm_model_name: str, response_format: str = 'json'):
+        if '/' not in llm_model_name:
+            raise ValueError(f"Model name '{llm_model_name}' must be in the format 'provider/model_name'.")
+        if response_format not in RESPONSE_FORMATS:
+            raise ValueError(f"Unknown response format: {response_format}")
+        # An empty request would be sent to every model in the fallback chain before failing
+        if not file and not (prompt and prompt.strip()):
+            raise ValueError("Prompt is empty and no file is attached.")
 
     """
     Async version is used by agent graphs
     """
     async def get_result_async(self, prompt: str, pydantic_model,
                                llm_model_name: str = 'deepseek/deepseek-prover-v2:free',
-                               file: Optional[Union[str, Path]] = None, provider='open_router', tools: list = None,
-                               agent_config: Optional[dict] = None) -> Tuple[T, LLMReport] | Tuple[None, None]:
-        if '/' not in llm_model_name:
-            raise ValueError(f"Model name '{llm_model_name}' must be in the format 'provider/model_name'.")
+                               file: Optional[Union[str, Path, List[Union[str, Path]]]] = None, provider='open_router', tools: list = None,
+                               agent_config: Optional[dict] = None,
+                               response_format: str = 'json') -> Tuple[T, LLMReport] | Tuple[None, None]:
+        self._validate_request(prompt, file, llm_model_name, response_format)
 
         tools = tools or []
-        user_prompt = self._prepare_prompt(prompt, file)
+        user_prompt = await self._prepare_prompt_async(prompt, file)
+        cache_key = await self._get_cache_key_async(user_prompt, pydantic_model, llm_model_name, provider, tools)
+        cached_result = self._get_cached_result(cache_key)
+        if cached_result:
+            return cached_result
+
+        # Identical requests already in flight (batches, fanned out agents) wait for that run and
+        # are answered from the cache instead of each sending the same request
+        pending = self._pending_results.get(cache_key) if cache_key else None
+        if pending is not None:
+            await asyncio.shield(pending)
+            cached_result = self._get_cached_result(cache_key)
+            if cached_result:
+                return cached_result
+
         fallback_models = self._build_fallback_chain(llm_model_name, provider, agent_config)
 
-        return await self._execute_with_fallback_async(user_prompt, pydantic_model, fallback_models, tools)
+        async def run_and_store():
+            result = await self._execute_with_fallback_async(user_prompt, pydantic_model, fallback_models, tools,
+                                                             response_format)
+            # Stored before the waiting requests resume, so they find it in the cache
+            self._store_cached_result(cache_key, result)
+            return result
 
-    def _prepare_prompt(self, prompt: str, file):
+        if not cache_key:
+            return await run_and_store()
+
+        run = asyncio.ensure_future(run_and_store())
+        self._pending_results[cache_key] = run
+        run.add_done_callback(lambda _: self._pending_results.pop(cache_key, None))
+        # Shielded so one cancelled request doesn't cancel the run for the others
+        return await asyncio.shield(run)
+
+    """
+    Streaming version, yields partially filled pydantic_model instances as the response arrives so
+    callers can act on early fields. The last yielded item is the complete result. Streams from the
+    requested model only (no fallback chain) and is never cached. Chunks are grouped for debounce_by
+    seconds so long answers aren't validated per token, None yields on every chunk for callers that
+    act on the first fields.
+    """
+    async def stream_result(self, prompt: str, pydantic_model,
+                            llm_model_name: str = 'deepseek/deepseek-prover-v2:free',
+                            file: Optional[Union[str, Path, List[Union[str, Path]]]] = None, provider='open_router',
+                            tools: list = None, debounce_by: Optional[float] = 0.1) -> AsyncIterator[T]:
+        self._validate_request(prompt, file, llm_model_name)
+
+        user_prompt = await self._prepare_prompt_async(prompt, file)
+        model_name = llm_model_name.split('/', 1)[-1] if provider != 'open_router' else llm_model_name
+        llm_provider = self._get_llm_provider(provider, model_name)
+        agent = self._get_agent(pydantic_model, tools or [])
+
+        async with agent.run_stream(user_prompt, model=llm_provider) as stream:
+            output = None
+            async for output in stream.stream(debounce_by=debounce_by):
+                yield output
+
+            # Usage is only known once the stream is complete
+            streamed_result = SimpleNamespace(output=output, usage=stream.usage, all_messages=stream.all_messages)
+            self._post_process(streamed_result, f"{provider}/{model_name}", provider, pydantic_model.__name__)
+
+    """
+    Runs independent requests concurrently. Each request is a dict of get_result_async kwargs,
+    results are returned in the same order and failures are returned as exceptions. Without
+    max_concurrency the limit comes from AI_HELPER_MAX_CONCURRENCY, so it can be raised to what
+    the account's rate limits allow.
+    """
+    async def get_results_async(self, requests: List[dict],
+                                max_concurrency: Optional[int] = None) -> List[Tuple[T, LLMReport] | Exception]:
+        semaphore = asyncio.Semaphore(max_concurrency or self.max_concurrency)
+
+        async def run_one(request: dict):
+            async with semaphore:
+                return await self.get_result_async(**request)
+
+        return await asyncio.gather(*(run_one(request) for request in requests), return_exceptions=True)
+
+    """
+    Sync version of get_results_async, dispatches the whole batch in one event loop
+    """
+    def get_results(self, requests: List[dict],
+                    max_concurrency: Optional[int] = None) -> List[Tuple[T, LLMReport] | Exception]:
+        if not requests:
+            return []
+        return _run_sync(self.get_results_async(requests, max_concurrency=max_concurrency))
+
+    """
+    Packs several short prompts into one request, for when the provider's requests per minute limit
+    is the bottleneck rather than tokens. The model answers all of them in one response, results are
+    returned in prompt order. Usage and cost are only known for the whole request, each report gets a
+    share by prompt and answer length. Text prompts only, without tools. With the cache on, each
+    prompt is cached on its own like a get_result request and only the uncached ones are sent.
+    """
+    async def get_packed_results_async(self, prompts: List[str], pydantic_model,
+                                       llm_model_name: str = 'deepseek/deepseek-prover-v2:free',
+                                       provider='open_router',
+                                       agent_config: Optional[dict] = None) -> List[Tuple[T, LLMReport]]:
+        if not prompts:
+            return []
+
+        cache_keys = [self._get_cache_key(prompt, pydantic_model, llm_model_name, provider, []) for prompt in prompts]
+        results = [self._get_cached_result(cache_key) for cache_key in cache_keys]
+        missing = [index for index, result in enumerate(results) if result is None]
+        if not missing:
+            return results
+
+        missing_prompts = [prompts[index] for index in missing]
+        packed_prompt = _pack_prompts(missing_prompts)
+        self._validate_request(packed_prompt, None, llm_model_name)
+        # The packed request itself isn't cached, its generated output model only exists in this process
+        fallback_models = self._build_fallback_chain(llm_model_name, provider, agent_config)
+        output, report = await self._execute_with_fallback_async(packed_prompt, _packed_model(pydantic_model),
+                                                                 fallback_models, [])
+        if output is None or len(output.results) != len(missing_prompts):
+            received = 'no' if output is None else len(output.results)
+            raise ValueError(f"Packed request returned {received} results for {len(missing_prompts)} prompts")
+
+        answer_lengths = [len(result.model_dump_json()) for result in output.results]
+        prompts_length, answers_length = max(sum(map(len, missing_prompts)), 1), sum(answer_lengths)
+        for index, prompt, output_item, answer_length in zip(missing, missing_prompts, output.results, answer_lengths):
+            share = (len(prompt) + answer_length) / (prompts_length + answers_length)
+            results[index] = (output_item, _split_report(report, share, len(prompt) / prompts_length,
+                                                         answer_length / answers_length))
+            self._store_cached_result(cache_keys[index], results[index])
+        return results
+
+    def get_packed_results(self, prompts: List[str], pydantic_model,
+                           llm_model_name: str = 'deepseek/deepseek-prover-v2:free', provider='open_router',
+                           agent_config: Optional[dict] = None) -> List[Tuple[T, LLMReport]]:
+        return _run_sync(self.get_packed_results_async(prompts, pydantic_model, llm_model_name, provider,
+                                                       agent_config))
+
+    """
+    Gemini Batch Mode, the OpenAI Batch API or Anthropic Message Batches (by the model's provider),
+    half price for requests that can wait up to 24 hours. submit_batch returns a job name,
+    get_batch_results returns None until the job has finished. Batches use the given model only, without tools, fallbacks or file attachments.
+    """
+    def submit_batch(self, prompts: List[str], pydantic_model,
+                     llm_model_name: str = 'google/gemini-2.5-flash') -> str:
+        self._validate_request(' '.join(prompts), None, llm_model_name)
+        provider, model_name = llm_model_name.split('/', 1)
+        if provider == 'openai':
+            return openai_batch.submit_batch(self._get_openai_client(), prompts, pydantic_model, model_name)
+        if provider == 'google':
+            return gemini_batch.submit_batch(self._get_google_client(), prompts, pydantic_model, model_name)
+        if provider == 'anthropic':
+            return anthropic_batch.submit_batch(self._get_anthropic_client(), prompts, pydantic_model, model_name)
+        raise ValueError(f"Batches are only supported for openai, google and anthropic models, "
+                         f"got '{llm_model_name}'.")
+
+    def get_batch_results(self, job_name: str, pydantic_model) -> Optional[List[T | Exception]]:
+        # Gemini job names are resource paths (batches/...), OpenAI and Anthropic ids are prefixed
+        # (batch_..., msgbatch_...)
+        if job_name.startswith('batches/'):
+            return gemini_batch.get_batch_results(self._get_google_client(), job_name, pydantic_model)
+        if job_name.startswith('batch_'):
+            return openai_batch.get_batch_results(self._get_openai_client(), job_name, pydantic_model)
+        if job_name.startswith('msgbatch_'):
+            return anthropic_batch.get_batch_results(self._get_anthropic_client(), job_name, pydantic_model)
+        raise ValueError(f"Unknown batch job name '{job_name}', expected a Gemini 'batches/...' name, an "
+                         f"OpenAI 'batch_...' id or an Anthropic 'msgbatch_...' id.")
+
+    def _get_google_client(self):
+        _, provider_class, env_key = self.providers['google']
+        return _get_provider_instance(_resolve_class(provider_class), os.getenv(env_key)).client
+
+    def _get_openai_client(self):
+        return _get_openai_sync_client(os.getenv(self.providers['openai'][2]))
+
+    def _get_anthropic_client(self):
+        return _get_anthropic_sync_client(os.getenv(self.providers['anthropic'][2]))
+
+    async def _prepare_prompt_async(self, prompt: str, file):
+        # Reading, decoding and downscaling an attachment blocks, keep it off the event loop so
+        # concurrent requests keep making progress
         if not file:
             return prompt
+        if not isinstance(file, (list, tuple)):
+            return [prompt, await self._load_file_async(file)]
+        # Several attachments load concurrently, each in its own worker thread
+        return [prompt, *await asyncio.gather(*(self._load_file_async(f) for f in file))]
 
+    async def _load_file_async(self, file) -> BinaryContent:
         file_path = Path(file)
         if not file_path.exists():
             raise FileNotFoundError(f"File not found: {file}")
 
-        return [prompt, BinaryContent(
-            data=file_path.read_bytes(),
-            media_type=mimetypes.guess_type(str(file_path))[0] or 'application/octet-stream'
-        )]
+        # Fanned out requests for the same file wait on one load instead of each reading it in a thread
+        stat = file_path.stat()
+        load_key = (file_path, stat.st_mtime_ns, stat.st_size)
+        pending = self._pending_loads.get(load_key)
+        if pending is None:
+            pending = asyncio.ensure_future(asyncio.to_thread(_get_binary_content, *load_key))
+            self._pending_loads[load_key] = pending
+            pending.add_done_callback(lambda _: self._pending_loads.pop(load_key, None))
+        # Shielded so one cancelled request doesn't cancel the load for the others
+        return await asyncio.shield(pending)
 
-    def _execute_with_fallback(self, user_prompt, pydantic_model, fallback_models, tools):
-        attempted_models, last_error = [], None
-        
+    def _prepare_prompt(self, prompt: str, file):
+        if not file:
+            return prompt
+        if not isinstance(file, (list, tuple)):
+            return [prompt, _load_file(file)]
+        # Reading and downscaling release the GIL, so several attachments load in parallel
+        with ThreadPoolExecutor(max_workers=min(len(file), MAX_FILE_LOAD_WORKERS)) as executor:
+            return [prompt, *executor.map(_load_file, file)]
+
+    async def _get_cache_key_async(self, user_prompt, *args) -> Optional[str]:
+        # Hashing an attachment reads all of its bytes, keep it off the event loop like the load
+        if self.cache is not None and isinstance(user_prompt, list):
+            return await asyncio.to_thread(self._get_cache_key, user_prompt, *args)
+        return self._get_cache_key(user_prompt, *args)
+
+    def _get_cache_key(self, user_prompt, pydantic_model, llm_model_name: str, provider: str,
+                       tools: list) -> Optional[str]:
+        # Tool results (weather, date, ...) change between runs, so those requests are never cached
+        if self.cache is None or tools:
+            return None
+
+        if isinstance(user_prompt, list):
+            prompt_text, *binary_contents = user_prompt
+            file_digests = [_get_file_digest(binary_content) for binary_content in binary_contents]
+            file_digest = file_digests[0] if len(file_digests) == 1 else file_digests
+        else:
+            prompt_text, file_digest = user_prompt, None
+
+        # Prompts built from templates often differ only in surrounding blank lines and trailing
+        # spaces, which don't change the answer. Indentation and line breaks can (code, YAML, tables)
+        prompt_text = '\n'.join(line.rstrip() for line in prompt_text.strip().splitlines())
+
+        return self.cache.make_key(model=llm_model_name, provider=provider, prompt=prompt_text, file=file_digest,
+                                   output=f"{pydantic_model.__module__}.{pydantic_model.__qualname__}")
+
+    def _get_cached_result(self, cache_key: Optional[str]) -> Optional[Tuple[T, LLMReport]]:
+        if cache_key is None:
+            return None
+
+        cached = self.cache.get(cache_key)
+        if cached is None:
+            return None
+
+        output, report = cached
         if self.logger:
-            self.logger.info(f"Starting execution with {len(fallback_models)} models in fallback chain")
-            self.logger.debug(f"Fallback models: {fallback_models}")
-            self.logger.debug(f"Output model: {pydantic_model.__name__}")
-            self.logger.debug(f"Tools provided: {[tool.__name__ if hasattr(tool, '__name__') else str(tool) for tool in tools]}")
+            self.logger.info(f"Cache hit for {report.model_name}")
+
+        # Cache hits cost nothing, so the report carries no usage. Values come from an already
+        # validated report, so skip validation
+        return output.model_copy(deep=True), LLMReport.model_construct(
+            model_name=report.model_name,
+            usage=Usage(),
+            fill_percentage=report.fill_percentage,
+            attempted_models=list(report.attempted_models),
+            fallback_used=report.fallback_used,
+            cached=True
+        )
+
+    def _store_cached_result(self, cache_key: Optional[str], result: Tuple[T, LLMReport]):
+        if cache_key is None:
+            return
+
+        output, report = result
+        self.cache.set(cache_key, (output.model_copy(deep=True), report))
+
+    def _execute_with_fallback(self, user_prompt, pydantic_model, fallback_models, tools, response_format='json'):
+        attempted_models, last_error = [], None
+        self._log_fallback_start(fallback_models, pydantic_model, tools)
 
         for idx, model_info in enumerate(fallback_models):
             model_start_time = time.time()
             try:
-                model_name, provider = model_info['model'], model_info['provider']
+                model_name, provider = model_info
                 full_model_name = f"{provider}/{model_name}"
                 attempted_models.append(full_model_name)
-                
-                if self.logger:
-                    self.logger.info(f"Attempting model {idx+1}/{len(fallback_models)}: {full_model_name}")
-
-                llm_provider = self._get_llm_provider(provider, model_name)
-                agent = Agent(llm_provider, output_type=pydantic_model, instrument=True, tools=tools)
-                
-                if self.logger:
-                    self.logger.debug(f"Agent created successfully for {full_model_name}")
-                    self.logger.debug(f"Running synchronous request...")
-                
+                llm_provider, agent = self._prepare_fallback_agent(idx, fallback_models, provider, model_name,
+                                                                   pydantic_model, tools, response_format)
+
                 # Use capture_run_messages for detailed forensics
                 with capture_run_messages() as messages:
                     try:
-                        agent_output = agent.run_sync(user_prompt)
-                        
-                        model_duration = time.time() - model_start_time
-                        if self.logger:
-                            self.logger.info(f"Model {full_model_name} succeeded in {model_duration:.2f}s")
-                            self.logger.debug(f"Usage: {agent_output.usage()}")
-                            # Log successful message exchange for debug purposes
-                            self.logger.debug(f"Successful message exchange had {len(messages)} messages")
-                            for i, message in enumerate(messages):
-                                self.logger.debug(f"Success Message {i+1}: {type(message).__name__}")
-                            
-                    except UnexpectedModelBehavior as e:
-                        model_duration = time.time() - model_start_time
-                        if self.logger:
-                            self.logger.error(f"UnexpectedModelBehavior for {full_model_name} after {model_duration:.2f}s: {e}")
-                            self.logger.error(f"Cause: {repr(e.__cause__)}")
-                            self.logger.error("=== FULL MESSAGE EXCHANGE ===")
-                            for i, message in enumerate(messages):
-                                self.logger.error(f"Message {i+1}: {message}")
-                            self.logger.error("=== END MESSAGE EXCHANGE ===")
-                        raise e
+                        agent_output = agent.run_sync(user_prompt, model=llm_provider)
                     except Exception as e:
-                        # Capture message exchange for any other exceptions too
-                        model_duration = time.time() - model_start_time
-                        if self.logger:
-                            self.logger.error(f"Exception in {full_model_name} after {model_duration:.2f}s: {e}")
-                            if messages:
-                                self.logger.error("=== MESSAGE EXCHANGE ON EXCEPTION ===")
-                                for i, message in enumerate(messages):
-                                    self.logger.error(f"Exception Message {i+1}: {message}")
-                                self.logger.error("=== END MESSAGE EXCHANGE ===")
+                        self._log_run_error(full_model_name, model_start_time, e, messages)
                         raise e
+                    self._log_run_success(full_model_name, model_start_time, agent_output, messages)
 
-                report = self._post_process(agent_output, full_model_name, provider, pydantic_model.__name__)
-                report.attempted_models = attempted_models
-                report.fallback_used = len(attempted_models) > 1
-
-                return agent_output.output, report
+                return self._fallback_result(agent_output, full_model_name, provider, pydantic_model,
+                                             attempted_models)
 
             except Exception as e:
-                model_duration = time.time() - model_start_time
                 last_error = e
-                error_msg = f"Model {model_info['model']} failed after {model_duration:.2f}s: {str(e)}"
-                print(error_msg)
-                
-                if self.logger:
-                    self.logger.warning(error_msg)
-                    self.logger.debug(f"Full traceback for {model_info['model']}: {traceback.format_exc()}")
-                
-                continue
-
-        final_error = f"All fallback models failed. Attempted: {attempted_models}. Last error: {str(last_error)}"
-        if self.logger:
-            self.logger.error(final_error)
-        raise Exception(final_error)
+                self._log_model_failure(model_info.model, model_start_time, e)
+
+        self._raise_fallback_failure(attempted_models, last_error)
 
-    async def _execute_with_fallback_async(self, user_prompt, pydantic_model, fallback_models, tools):
+    async def _execute_with_fallback_async(self, user_prompt, pydantic_model, fallback_models, tools,
+                                           response_format='json'):
         attempted_models, last_error = [], None
-        
-        if self.logger:
-            self.logger.info(f"Starting async execution with {len(fallback_models)} models in fallback chain")
-            self.logger.debug(f"Fallback models: {fallback_models}")
-            self.logger.debug(f"Output model: {pydantic_model.__name__}")
-            self.logger.debug(f"Tools provided: {[tool.__name__ if hasattr(tool, '__name__') else str(tool) for tool in tools]}")
+        self._log_fallback_start(fallback_models, pydantic_model, tools)
 
         for idx, model_info in enumerate(fallback_models):
             model_start_time = time.time()
             try:
-                model_name, provider = model_info['model'], model_info['provider']
+                model_name, provider = model_info
                 full_model_name = f"{provider}/{model_name}"
                 attempted_models.append(full_model_name)
-                
-                if self.logger:
-                    self.logger.info(f"Attempting async model {idx+1}/{len(fallback_models)}: {full_model_name}")
-                
-                llm_provider = self._get_llm_provider(provider, model_name)
-                agent = Agent(llm_provider, output_type=pydantic_model, instrument=True, tools=tools)
-                
-                if self.logger:
-                    self.logger.debug(f"Async agent created successfully for {full_model_name}")
-                    self.logger.debug(f"Running asynchronous request...")
-                
+                llm_provider, agent = self._prepare_fallback_agent(idx, fallback_models, provider, model_name,
+                                                                   pydantic_model, tools, response_format)
+
                 # Use capture_run_messages for detailed forensics
                 with capture_run_messages() as messages:
                     try:
-                        agent_output = await agent.run(user_prompt)
-                        
-                        model_duration = time.time() - model_start_time
-                        if self.logger:
-                            self.logger.info(f"Async model {full_model_name} succeeded in {model_duration:.2f}s")
-                            self.logger.debug(f"Usage: {agent_output.usage()}")
-                            # Log successful message exchange for debug purposes
-                            self.logger.debug(f"Successful async message exchange had {len(messages)} messages")
-                            for i, message in enumerate(messages):
-                                self.logger.debug(f"Async Success Message {i+1}: {type(message).__name__}")
-                            
-                    except UnexpectedModelBehavior as e:
-                        model_duration = time.time() - model_start_time
-                        if self.logger:
-                            self.logger.error(f"UnexpectedModelBehavior for {full_model_name} after {model_duration:.2f}s: {e}")
-                            self.logger.error(f"Cause: {repr(e.__cause__)}")
-                            self.logger.error("=== FULL ASYNC MESSAGE EXCHANGE ===")
-                            for i, message in enumerate(messages):
-                                self.logger.error(f"Async Message {i+1}: {message}")
-                            self.logger.error("=== END ASYNC MESSAGE EXCHANGE ===")
-                        raise e
+                        agent_output = await agent.run(user_prompt, model=llm_provider)
                     except Exception as e:
-                        # Capture message exchange for any other exceptions too
-                        model_duration = time.time() - model_start_time
-                        if self.logger:
-                            self.logger.error(f"Async exception in {full_model_name} after {model_duration:.2f}s: {e}")
-                            if messages:
-                                self.logger.error("=== ASYNC MESSAGE EXCHANGE ON EXCEPTION ===")
-                                for i, message in enumerate(messages):
-                                    self.logger.error(f"Async Exception Message {i+1}: {message}")
-                                self.logger.error("=== END ASYNC MESSAGE EXCHANGE ===")
+                        self._log_run_error(full_model_name, model_start_time, e, messages)
                         raise e
+                    self._log_run_success(full_model_name, model_start_time, agent_output, messages)
 
-                report = self._post_process(agent_output, full_model_name, provider, pydantic_model.__name__)
-                report.attempted_models = attempted_models
-                report.fallback_used = len(attempted_models) > 1
-
-                return agent_output.output, report
+                return self._fallback_result(agent_output, full_model_name, provider, pydantic_model,
+                                             attempted_models)
 
             except Exception as e:
-                model_duration = time.time() - model_start_time
                 last_error = e
-                error_msg = f"Async model {model_info['model']} failed after {model_duration:.2f}s: {str(e)}"
-                print(error_msg)
-                
-                if self.logger:
-                    self.logger.warning(error_msg)
-                    self.logger.debug(f"Full async traceback for {model_info['model']}: {traceback.format_exc()}")
-                
-                continue
-
-        final_error = f"All async fallback models failed. Attempted: {attempted_models}. Last error: {str(last_error)}"
+                self._log_model_failure(model_info.model, model_start_time, e)
+
+        self._raise_fallback_failure(attempted_models, last_error)
+
+    """
+    Shared steps of the sync and async fallback loops, only the agent run itself differs
+    """
+    def _log_fallback_start(self, fallback_models, pydantic_model, tools):
+        if self.logger:
+            self.logger.info(f"Starting execution with {len(fallback_models)} models in fallback chain")
+            self.logger.debug(f"Fallback models: {fallback_models}")
+            self.logger.debug(f"Output model: {pydantic_model.__name__}")
+            self.logger.debug(f"Tools provided: {[tool.__name__ if hasattr(tool, '__name__') else str(tool) for tool in tools]}")
+
+    def _prepare_fallback_agent(self, idx, fallback_models, provider, model_name, pydantic_model, tools,
+                                response_format) -> Tuple[Any, Agent]:
+        full_model_name = f"{provider}/{model_name}"
+        if self.logger:
+            self.logger.info(f"Attempting model {idx+1}/{len(fallback_models)}: {full_model_name}")
+
+        llm_provider = self._get_llm_provider(provider, model_name)
+        # Models without native structured output (and Gemini with tools) get the JSON tool call output
+        if response_format == 'native' and not _supports_native_output(llm_provider, tools):
+            response_format = 'json'
+        agent = self._get_agent(pydantic_model, tools, response_format)
+
+        if self.logger:
+            self.logger.debug(f"Agent created successfully for {full_model_name}")
+        return llm_provider, agent
+
+    def _log_run_success(self, full_model_name, model_start_time, agent_output, messages):
+        if self.logger:
+            model_duration = time.time() - model_start_time
+            self.logger.info(f"Model {full_model_name} succeeded in {model_duration:.2f}s")
+            if not self.logger.isEnabledFor(logging.DEBUG):
+                return
+            self.logger.debug(f"Usage: {agent_output.usage()}")
+            # One line for the whole exchange, long histories would otherwise log a record per message
+            message_types = ', '.join([type(message).__name__ for message in messages])
+            self.logger.debug(f"Successful message exchange had {len(messages)} messages: {message_types}")
+
+    def _log_run_error(self, full_model_name, model_start_time, error, messages):
+        if not self.logger:
+            return
+
+        model_duration = time.time() - model_start_time
+        if isinstance(error, UnexpectedModelBehavior):
+            self.logger.error(f"UnexpectedModelBehavior for {full_model_name} after {model_duration:.2f}s: {error}")
+            self.logger.error(f"Cause: {repr(error.__cause__)}")
+            self.logger.error("=== FULL MESSAGE EXCHANGE ===")
+            for i, message in enumerate(messages):
+                self.logger.error(f"Message {i+1}: {message}")
+            self.logger.error("=== END MESSAGE EXCHANGE ===")
+        else:
+            # Capture message exchange for any other exceptions too
+            self.logger.error(f"Exception in {full_model_name} after {model_duration:.2f}s: {error}")
+            if messages:
+                self.logger.error("=== MESSAGE EXCHANGE ON EXCEPTION ===")
+                for i, message in enumerate(messages):
+                    self.logger.error(f"Exception Message {i+1}: {message}")
+                self.logger.error("=== END MESSAGE EXCHANGE ===")
+
+    def _fallback_result(self, agent_output, full_model_name, provider, pydantic_model,
+                         attempted_models) -> Tuple[T, LLMReport]:
+        report = self._post_process(agent_output, full_model_name, provider, pydantic_model.__name__)
+        report.attempted_models = attempted_models
+        report.fallback_used = len(attempted_models) > 1
+        return agent_output.output, report
+
+    def _log_model_failure(self, model_name, model_start_time, error):
+        # Arguments are only formatted if a handler takes the record, concurrent fallbacks would
+        # otherwise stringify every provider error (and its response body) up front
+        model_duration = time.time() - model_start_time
+        logger.warning("Model %s failed after %.2fs: %s", model_name, model_duration, error)
+
+        if self.logger:
+            self.logger.warning("Model %s failed after %.2fs: %s", model_name, model_duration, error)
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(f"Full traceback for {model_name}: {traceback.format_exc()}")
+
+    def _raise_fallback_failure(self, attempted_models, last_error):
+        error = FallbackError(attempted_models, last_error)
         if self.logger:
-            self.logger.error(final_error)
-        raise Exception(final_error)
+            self.logger.error("%s", error)
+        raise error from last_error
 
-    def _build_fallback_chain(self, primary_model: str, primary_provider: str, agent_config: dict = None) -> List[dict]:
+    """
+    Agents are model independent, the model is passed per run. Building an agent compiles the output
+    model's validator and JSON schema, so every model in a fallback chain or batch shares one agent
+    per output model, tools and response format.
+    """
+    def _get_agent(self, pydantic_model, tools: list, response_format: str = 'json') -> Agent:
+        return self._agents.get_or_build(tools, (pydantic_model, response_format),
+                                         lambda: self._create_agent(pydantic_model, tools, response_format))
+
+    """
+    YAML output trades pydantic-ai's JSON tool-call output for a plain YAML answer, which takes
+    fewer completion tokens. Native output sends the JSON schema as the provider's response format
+    (OpenAI json_schema, Gemini response_schema), the answer is the JSON itself instead of a tool
+    call around it. JSON stays the default as it is the most reliable across models.
+    """
+    def _create_agent(self, pydantic_model, tools: list, response_format: str = 'json') -> Agent:
+        if response_format == 'yaml':
+            return Agent(output_type=yaml_output(pydantic_model), instrument=True,
+                         tools=_prepare_tools(tools), instructions=yaml_instructions(pydantic_model))
+        if response_format == 'native':
+            return Agent(output_type=NativeOutput(pydantic_model), instrument=True, tools=_prepare_tools(tools))
+
+        # Tools that already return the output model end the run with their result, which saves
+        # the follow-up LLM request that would only restate it
+        output_tools = [tool for tool in tools if _returns_output_model(tool, pydantic_model)]
+        if output_tools:
+            output_type = [pydantic_model, *(ToolOutput(tool, name=tool.__name__) for tool in output_tools)]
+            tools = [tool for tool in tools if tool not in output_tools]
+            return Agent(output_type=output_type, instrument=True, tools=_prepare_tools(tools))
+
+        return Agent(output_type=pydantic_model, instrument=True, tools=_prepare_tools(tools))
+
+    def _build_fallback_chain(self, primary_model: str, primary_provider: str,
+                              agent_config: dict = None) -> List[FallbackModel]:
+        # The chain only depends on the primary model, the system config and the agent config. Agents
+        # pass the same config dict on every run, so chains are built once per model and config
+        fallback_chain = self._fallback_chains.get_or_build(
+            (agent_config or None,), (primary_model, primary_provider),
+            lambda: self._create_fallback_chain(primary_model, primary_provider, agent_config))
+        return list(fallback_chain)
+
+    def _create_fallback_chain(self, primary_model: str, primary_provider: str,
+                               agent_config: dict = None) -> List[FallbackModel]:
         # Handle primary model - keep full format for open_router, strip for others
         primary_model_name = primary_model.split('/', 1)[-1] if primary_provider != 'open_router' else primary_model
-        fallback_chain = [{'model': primary_model_name, 'provider': primary_provider}]
+        fallback_chain = [FallbackModel(primary_model_name, primary_provider)]
 
         # Add agent-specific fallbacks
         if agent_config:
@@ -278,49 +937,41 @@ class AiHelper:
                 # Strip provider prefix if present, except for open_router
                 if '/' in fallback_model and agent_config['fallback_provider'] != 'open_router':
                     fallback_model = fallback_model.split('/', 1)[-1]
-                fallback_chain.append(
-                    {'model': fallback_model, 'provider': agent_config['fallback_provider']})
+                fallback_chain.append(FallbackModel(fallback_model, agent_config['fallback_provider']))
 
             for fallback in agent_config.get('fallback_chain', []):
                 model = fallback['model']
                 # Strip provider prefix if present, except for open_router
                 if '/' in model and fallback['provider'] != 'open_router':
                     model = model.split('/', 1)[-1]
-                fallback_chain.append({'model': model, 'provider': fallback['provider']})
+                fallback_chain.append(FallbackModel(model, fallback['provider']))
 
         # Add system fallbacks
         try:
             model = self.config_helper.get_fallback_model()
             provider = self.config_helper.get_fallback_provider()
-            fallback_chain.append({'model': model, 'provider': provider})
+            fallback_chain.append(FallbackModel(model, provider))
 
-            fallback_chain.extend([{'model': f.model, 'provider': f.provider}
-                                   for f in self.config_helper.get_fallback_chain()])
+            fallback_chain.extend(FallbackModel(f.model, f.provider) for f in self.config_helper.get_fallback_chain())
         except Exception as e:
-            print(f"Error loading system fallbacks: {e}")
-
-        # Remove duplicates
-        seen, unique_chain = set(), []
-        for item in fallback_chain:
-            key = f"{item['provider']}/{item['model']}"
-            if key not in seen:
-                seen.add(key)
-                unique_chain.append(item)
+            logger.error(f"Error loading system fallbacks: {e}")
 
-        return unique_chain
+        # Remove duplicates, keeping the first occurrence
+        return list(dict.fromkeys(fallback_chain))
 
     def _post_process(self, agent_result: AgentRunResult, model_name: str, provider: str,
                       pydantic_model_name: str) -> LLMReport:
-        filled_fields = sum(1 for field in agent_result.output.__dict__.values() if field is not None)
-        total_fields = len(agent_result.output.__dict__)
+        field_values = agent_result.output.__dict__.values()
+        filled_fields = sum(value is not None for value in field_values)
+        usage = agent_result.usage()
 
         report = LLMReport(
             model_name=model_name,
-            usage=agent_result.usage(),
+            usage=usage,
             run_date=datetime.now(),
             run_id=str(uuid.uuid4()),
-            cost=self.info_provider.get_cost_info(model_name, agent_result.usage()),
-            fill_percentage=int((filled_fields / total_fields) * 100)
+            cost=self.info_provider.get_cost_info(model_name, usage),
+            fill_percentage=int((filled_fields / len(field_values)) * 100)
         )
 
         self.usage_tracker.add_usage(report, provider, model_name, pydantic_model_name,
@@ -329,23 +980,22 @@ class AiHelper:
 
     def _extract_tool_names(self, agent_run_result: AgentRunResult) -> List[str]:
         if not hasattr(agent_run_result, 'all_messages') or not callable(agent_run_result.all_messages):
-            print("Warning: agent_run_result.all_messages() not available.")
+            logger.warning("agent_run_result.all_messages() not available.")
             return []
 
-        tool_names = []
-        for message in agent_run_result.all_messages() or []:
-            if isinstance(message, ModelResponse):
-                tool_names.extend(part.tool_name for part in message.parts if isinstance(part, ToolCallPart))
-        return tool_names
+        return [part.tool_name
+                for message in agent_run_result.all_messages() or [] if isinstance(message, ModelResponse)
+                for part in message.parts if isinstance(part, ToolCallPart)]
 
     def _get_llm_provider(self, name: str, model_name: str) -> Any:
         if name not in self.providers:
             raise ValueError(f"Unknown provider: {name}")
 
         model_class, provider_class, env_key = self.providers[name]
+        model_class, provider_class = _resolve_class(model_class), _resolve_class(provider_class)
 
         # Handle model name formatting
         # if name == 'open_router' and not self.info_provider.get_model_info(model_name):
         #     raise ValueError(f"Unknown model: {model_name}")
 
-        return model_class(model_name, provider=provider_class(api_key=os.getenv(env_key)))
+        return _get_model_instance(model_class, model_name, _get_provider_instance(provider_class, os.getenv(env_key)))
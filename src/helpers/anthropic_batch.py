@@ -0,0 +1,67 @@
+from typing import List, Optional, Type
+
+from pydantic import BaseModel, ValidationError
+
+
+"""
+Anthropic Message Batches API for requests that don't need an answer right away (bulk
+classification, model checks, evaluations). Batches are billed at half the per-token price and
+finish within 24 hours. Like Gemini and OpenAI batches, they run on a single model without tools
+or the fallback chain. Anthropic has no JSON response format, so the answer is requested as a
+forced call of a tool whose input schema is the pydantic model, the same way pydantic-ai does it.
+"""
+
+BATCH_FINISHED_STATE = 'ended'
+# Answers are a single structured output, Anthropic requires an explicit limit
+MAX_OUTPUT_TOKENS = 4096
+
+
+def _output_tool(pydantic_model: Type[BaseModel]) -> dict:
+    return {'name': 'final_result', 'description': f"Return the answer as {pydantic_model.__name__}",
+            'input_schema': pydantic_model.model_json_schema()}
+
+
+def submit_batch(client, prompts: List[str], pydantic_model: Type[BaseModel], model_name: str) -> str:
+    """Submits the prompts as one message batch and returns the batch id to poll with get_batch_results"""
+    # The params only differ by prompt, so all requests share the tool definition
+    tool = _output_tool(pydantic_model)
+    requests = [{'custom_id': str(index),
+                 'params': {'model': model_name, 'max_tokens': MAX_OUTPUT_TOKENS,
+                            'messages': [{'role': 'user', 'content': prompt}],
+                            'tools': [tool], 'tool_choice': {'type': 'tool', 'name': tool['name']}}}
+                for index, prompt in enumerate(prompts)]
+
+    batch = client.messages.batches.create(requests=requests)
+    return batch.id
+
+
+def _parse_result(result, pydantic_model: Type[BaseModel]) -> BaseModel | Exception:
+    if result.type != 'succeeded':
+        return RuntimeError(f"Batch request {result.type}: {getattr(result, 'error', None)}")
+
+    tool_inputs = [block.input for block in result.message.content if block.type == 'tool_use']
+    if not tool_inputs:
+        return RuntimeError("Batch request returned no structured output")
+    try:
+        return pydantic_model.model_validate(tool_inputs[0])
+    except ValidationError as e:
+        return e
+
+
+def get_batch_results(client, batch_id: str,
+                      pydantic_model: Type[BaseModel]) -> Optional[List[BaseModel | Exception]]:
+    """
+    None while the batch is still running. Once finished, results are returned in prompt order and
+    failed, cancelled or expired requests are returned as exceptions.
+    """
+    batch = client.messages.batches.retrieve(batch_id)
+    if batch.processing_status != BATCH_FINISHED_STATE:
+        return None
+
+    counts = batch.request_counts
+    total = counts.processing + counts.succeeded + counts.errored + counts.canceled + counts.expired
+    # Results are not in input order, custom_id is the prompt index
+    results: List[BaseModel | Exception] = [RuntimeError("Batch request returned no response")] * total
+    for entry in client.messages.batches.results(batch_id):
+        results[int(entry.custom_id)] = _parse_result(entry.result, pydantic_model)
+    return results
@@ -0,0 +1,31 @@
+from pydantic_ai.models import ModelRequestParameters
+from pydantic_ai.models.anthropic import AnthropicModel
+from pydantic_ai.tools import ToolDefinition
+
+from helpers.identity_cache import IdentityCache
+
+
+"""
+Anthropic model with prompt caching for tool definitions. Tool schemas are large and identical
+across requests, so the last tool is marked as a cache breakpoint and repeat requests read the
+whole tool block from Anthropic's prompt cache (cheaper, less prompt processing latency).
+"""
+
+# pydantic-ai reuses each tool's JSON schema object, so its identity keys the translated tool
+_TOOL_PARAM_CACHE_SIZE = 256
+_tool_param_cache = IdentityCache(_TOOL_PARAM_CACHE_SIZE)
+
+
+class CachedAnthropicModel(AnthropicModel):
+    def _get_tools(self, model_request_parameters: ModelRequestParameters) -> list:
+        tools = [self._get_tool_param(tool_def) for tool_def in model_request_parameters.function_tools]
+        tools += [self._get_tool_param(tool_def) for tool_def in model_request_parameters.output_tools]
+        if tools:
+            # A single breakpoint on the last tool caches all of them (Anthropic allows max 4)
+            tools[-1] = {**tools[-1], 'cache_control': {'type': 'ephemeral'}}
+        return tools
+
+    def _get_tool_param(self, tool_def: ToolDefinition) -> dict:
+        key = (tool_def.name, tool_def.description)
+        return _tool_param_cache.get_or_build((tool_def.parameters_json_schema,), key,
+                                              lambda: self._map_tool_definition(tool_def))
@@ -0,0 +1,7 @@
+from pydantic_ai.models.google import GoogleModel
+
+from helpers.cached_schema_model import CachedSchemaMixin
+
+
+class CachedGoogleModel(CachedSchemaMixin, GoogleModel):
+    """Gemini model that rewrites each tool schema to Gemini's supported subset only once"""
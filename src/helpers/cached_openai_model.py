@@ -0,0 +1,62 @@
+import functools
+
+from pydantic_ai.messages import BinaryContent, UserPromptPart
+from pydantic_ai.models.openai import OpenAIModel
+from pydantic_ai.profiles.openai import OpenAIModelProfile
+from pydantic_ai.tools import ToolDefinition
+
+from helpers.cached_schema_model import CachedSchemaMixin
+from helpers.identity_cache import IdentityCache
+
+
+"""
+Attachments are sent to OpenAI as base64 data URLs, which pydantic-ai encodes again for every
+request: each fallback attempt, each turn of a tool-using run and each model of a batch run. The
+encoded part only depends on the attachment, so it is built once per attachment and reused. Tool
+definitions are translated once per tool schema the same way.
+"""
+
+# pydantic-ai reuses each tool's (rewritten) JSON schema object, so its identity keys the translated tool
+_TOOL_PARAM_CACHE_SIZE = 256
+_tool_param_cache = IdentityCache(_TOOL_PARAM_CACHE_SIZE)
+
+# Loaded attachments are shared between requests, so their identity keys the encoded part. Each
+# entry holds a full base64 copy of the file, so only a few are kept
+_CONTENT_PART_CACHE_SIZE = 8
+_content_part_cache = IdentityCache(_CONTENT_PART_CACHE_SIZE)
+
+
+class CachedOpenAIModel(CachedSchemaMixin, OpenAIModel):
+    """OpenAI (and OpenRouter) model that translates tool schemas and encodes attachments only once"""
+
+    @staticmethod
+    async def _map_user_prompt(part: UserPromptPart):
+        if isinstance(part.content, str) or not any(isinstance(item, BinaryContent) for item in part.content):
+            return await OpenAIModel._map_user_prompt(part)
+
+        content = []
+        for item in part.content:
+            if isinstance(item, BinaryContent):
+                content.append(await _get_content_part(item))
+            else:
+                mapped = await OpenAIModel._map_user_prompt(UserPromptPart(content=[item]))
+                content.extend(mapped['content'])
+        return {'role': 'user', 'content': content}
+
+    @functools.cached_property
+    def _supports_strict_tools(self) -> bool:
+        return OpenAIModelProfile.from_profile(self.profile).openai_supports_strict_tool_definition
+
+    def _map_tool_definition(self, f: ToolDefinition) -> dict:
+        strict = bool(f.strict and self._supports_strict_tools)
+        return _tool_param_cache.get_or_build((f.parameters_json_schema,), (f.name, f.description, strict),
+                                              lambda: super(CachedOpenAIModel, self)._map_tool_definition(f))
+
+
+async def _get_content_part(binary_content: BinaryContent) -> dict:
+    content_part = _content_part_cache.get((binary_content,))
+    if content_part is None:
+        mapped = await OpenAIModel._map_user_prompt(UserPromptPart(content=[binary_content]))
+        content_part = mapped['content'][0]
+        _content_part_cache.set((binary_content,), None, content_part)
+    return content_part
@@ -0,0 +1,49 @@
+from dataclasses import replace
+
+from pydantic_ai.models import ModelRequestParameters
+from pydantic_ai.tools import ToolDefinition
+
+from helpers.identity_cache import IdentityCache
+
+
+"""
+Models whose profile rewrites tool JSON schemas (OpenAI strict mode, Gemini's schema subset) walk
+and copy every tool schema before each request, including every turn of a tool-using run. The
+rewritten schema only depends on the original one, so it is built once per schema and reused.
+"""
+
+# pydantic-ai reuses each tool's JSON schema object, so its identity keys the rewritten schema
+_TOOL_SCHEMA_CACHE_SIZE = 256
+_tool_schema_cache = IdentityCache(_TOOL_SCHEMA_CACHE_SIZE)
+
+
+def _rewrite_schema(transformer, schema: dict, strict) -> tuple:
+    schema_transformer = transformer(schema, strict=strict)
+    return schema_transformer.walk(), schema_transformer.is_strict_compatible
+
+
+def _customize_tool_def(transformer, tool_def: ToolDefinition) -> ToolDefinition:
+    schema = tool_def.parameters_json_schema
+    customized_schema, is_strict_compatible = _tool_schema_cache.get_or_build(
+        (schema,), (transformer, tool_def.strict), lambda: _rewrite_schema(transformer, schema, tool_def.strict))
+    strict = is_strict_compatible if tool_def.strict is None else tool_def.strict
+    return replace(tool_def, parameters_json_schema=customized_schema, strict=strict)
+
+
+class CachedSchemaMixin:
+    def customize_request_parameters(self, model_request_parameters: ModelRequestParameters) -> ModelRequestParameters:
+        transformer = self.profile.json_schema_transformer
+        if not transformer:
+            return super().customize_request_parameters(model_request_parameters)
+
+        customized = replace(
+            model_request_parameters,
+            function_tools=[_customize_tool_def(transformer, t) for t in model_request_parameters.function_tools],
+            output_tools=[_customize_tool_def(transformer, t) for t in model_request_parameters.output_tools],
+        )
+        if model_request_parameters.output_object:
+            # Native structured output (response_format='native'), only the output object is left to pydantic-ai
+            output_only = replace(model_request_parameters, function_tools=[], output_tools=[])
+            customized = replace(customized,
+                                 output_object=super().customize_request_parameters(output_only).output_object)
+        return customized
@@ -1,8 +1,9 @@
+from ai_helper import AiHelper
 from helpers.config_helper import ConfigHelper
 from helpers.llm_info_provider import LLMInfoProvider
 from py_models.weather.model import WeatherModel
 from py_models.file_analysis.model import FileAnalysisModel
-from helpers.test_helpers_utils import test_weather, test_file_analysis
+from helpers.test_helpers_utils import WEATHER_PROMPT, WEATHER_TOOLS, FILE_ANALYSIS_PROMPT, FILE_ANALYSIS_FILE
 
 """
 This script will run through all models and test the tool calling, marking non-working ones to config.
@@ -12,46 +13,48 @@ def flag_non_working_models(report_file_path: str = 'logs/tool_call_errors.txt')
     config_helper = ConfigHelper()
 
     models = info_provider.get_models()
-    started = False
+    # Checks resume from this model, the ones listed before it have already been checked
+    if 'openai/o4-mini-high' in models:
+        models = models[models.index('openai/o4-mini-high'):]
+    else:
+        models = []
 
-    for model in models:
-        if model == 'openai/o4-mini-high':
-            started = True
+    # The models are independent, so they are checked as one concurrent batch
+    requests = [{'prompt': WEATHER_PROMPT, 'pydantic_model': WeatherModel, 'llm_model_name': model,
+                 'provider': 'open_router', 'tools': WEATHER_TOOLS} for model in models]
+    outcomes = AiHelper().get_results(requests)
+    report_lines = []
 
-        if not started:
-            continue
-
-        try:
-            result, report = test_weather(model_name=model, provider='open_router')
-            print(result.model_dump_json(indent=4))
-            print(report.model_dump_json(indent=4))
-        except Exception as e:
-            print(f"Error with model {model}: {e}")
+    for model, outcome in zip(models, outcomes):
+        if isinstance(outcome, Exception):
+            print(f"Error with model {model}: {outcome}")
             config_helper.append_config_list('excluded_models', model)
-            with open(report_file_path, 'a') as f:
-                f.write(f"Model: {model} Error: {e}\n")
+            report_lines.append(f"Model: {model} Error: {outcome}\n")
             continue
 
+        result, report = outcome
+        print(result.model_dump_json(indent=4))
+        print(report.model_dump_json(indent=4))
+
         try:
             if not isinstance(result, WeatherModel):
                 print(f"Model {model} did not return a valid WeatherModel instance.")
                 config_helper.append_config_list('excluded_models', model)
-                with open(report_file_path, 'w') as f:
-                    f.write(f"Model: {model} did not return a valid WeatherModel instance\n")
+                report_lines.append(f"Model: {model} did not return a valid WeatherModel instance\n")
                 continue
 
             if 'Sofia' not in result.haiku or 'Sofia' not in result.report:
                 print(f"Model {model} did not return expected location in haiku or result: {result.haiku}")
                 config_helper.append_config_list('excluded_models', model)
-                with open(report_file_path, 'w') as f:
-                    f.write(f"Incomplete response from {model}\n")
+                report_lines.append(f"Incomplete response from {model}\n")
         except Exception as e:
             print(f"Error processing model {model}: {e}")
             config_helper.append_config_list('excluded_models', model)
-            with open(report_file_path, 'w') as f:
-                f.write(f"Model: {model} Error: {e}\n")
+            report_lines.append(f"Model: {model} Error: {e}\n")
             continue
 
+    _write_report(report_file_path, report_lines)
+
 
 def flag_file_capable_models(report_file_path: str = 'logs/file_capability_results.txt'):
     info_provider = LLMInfoProvider()
@@ -59,36 +62,46 @@ def flag_file_capable_models(report_file_path: str = 'logs/file_capability_resul
 
     models = info_provider.get_models()
 
-    for model in models:
-        try:
-            result, report = test_file_analysis(model_name=model, provider='open_router')
-            print(f"Testing model: {model}")
-            print(result.model_dump_json(indent=4))
-            print(report.model_dump_json(indent=4))
-        except Exception as e:
-            print(f"Error with model {model}: {e}")
-            with open(report_file_path, 'a') as f:
-                f.write(f"Model: {model} Error: {e}\n")
+    # All models get the same file, so dispatch them as one batch
+    requests = [{'prompt': FILE_ANALYSIS_PROMPT, 'pydantic_model': FileAnalysisModel, 'llm_model_name': model,
+                 'provider': 'open_router', 'file': FILE_ANALYSIS_FILE} for model in models]
+    outcomes = AiHelper().get_results(requests)
+    report_lines = []
+
+    for model, outcome in zip(models, outcomes):
+        print(f"Testing model: {model}")
+        if isinstance(outcome, Exception):
+            print(f"Error with model {model}: {outcome}")
+            report_lines.append(f"Model: {model} Error: {outcome}\n")
             continue
 
+        result, report = outcome
+        print(result.model_dump_json(indent=4))
+        print(report.model_dump_json(indent=4))
+
         try:
             if not isinstance(result, FileAnalysisModel):
                 print(f"Model {model} did not return a valid FileAnalysisModel instance.")
-                with open(report_file_path, 'a') as f:
-                    f.write(f"Model: {model} did not return a valid FileAnalysisModel instance\n")
+                report_lines.append(f"Model: {model} did not return a valid FileAnalysisModel instance\n")
                 continue
 
             if result.key == 'dog' and result.value == 'Roger':
                 print(f"Model {model} successfully extracted key='dog' and value='Roger' - adding to file_capable_models")
                 config_helper.append_config_list('file_capable_models', model)
-                with open(report_file_path, 'a') as f:
-                    f.write(f"SUCCESS: Model {model} extracted key='{result.key}' value='{result.value}'\n")
+                report_lines.append(f"SUCCESS: Model {model} extracted key='{result.key}' value='{result.value}'\n")
             else:
                 print(f"Model {model} did not extract correct key/value: key='{result.key}' value='{result.value}'")
-                with open(report_file_path, 'a') as f:
-                    f.write(f"FAILED: Model {model} extracted key='{result.key}' value='{result.value}'\n")
+                report_lines.append(f"FAILED: Model {model} extracted key='{result.key}' value='{result.value}'\n")
         except Exception as e:
             print(f"Error processing model {model}: {e}")
-            with open(report_file_path, 'a') as f:
-                f.write(f"Model: {model} Error: {e}\n")
+            report_lines.append(f"Model: {model} Error: {e}\n")
             continue
+
+    _write_report(report_file_path, report_lines)
+
+
+def _write_report(report_file_path: str, report_lines: list):
+    # Lines are collected while the models run and appended in one write
+    if report_lines:
+        with open(report_file_path, 'a') as f:
+            f.write(''.join(report_lines))
@@ -1,4 +1,3 @@
-import json
 from os import path
 from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, Field
@@ -31,13 +30,14 @@ class ConfigHelper:
             raise FileNotFoundError(f"Configuration file not found: {self.config_path}")
         self.configuration = self._load()
 
+    # Parsed and written by pydantic-core directly, without building an intermediate dict
     def _load(self) -> Config:
-        with open(self.config_path, 'r') as f:
-            return Config(**json.load(f))
+        with open(self.config_path, 'rb') as f:
+            return Config.model_validate_json(f.read())
 
     def _save(self):
-        with open(self.config_path, 'w') as f:
-            json.dump(self.configuration.model_dump(), f, indent=4)
+        with open(self.config_path, 'w', encoding='utf-8') as f:
+            f.write(self.configuration.model_dump_json(indent=4))
 
     def get_config(self, key: str) -> Any:
         return getattr(self.configuration, key, None)
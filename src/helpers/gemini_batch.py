@@ -0,0 +1,70 @@
+from typing import List, Optional, Type
+
+from pydantic import BaseModel, ValidationError
+
+
+"""
+Gemini Batch Mode for requests that don't need an answer right away (bulk classification, model
+checks, evaluations). Batch jobs are billed at half the per-token price and finish within 24 hours.
+Jobs run on a single model without tools or the fallback chain, responses are requested as JSON
+matching the pydantic model and validated with it.
+"""
+
+BATCH_FINISHED_STATES = ('JOB_STATE_SUCCEEDED', 'JOB_STATE_PARTIALLY_SUCCEEDED', 'JOB_STATE_FAILED',
+                         'JOB_STATE_CANCELLED', 'JOB_STATE_EXPIRED')
+
+
+def submit_batch(client, prompts: List[str], pydantic_model: Type[BaseModel], model_name: str,
+                 display_name: Optional[str] = None) -> str:
+    """Submits the prompts as one inline batch job and returns the job name to poll with get_batch_results"""
+    # Requests are plain dicts, which google-genai accepts in place of its types. The config is the
+    # same for every prompt, so all requests share one dict instead of each building its own
+    config = {'response_mime_type': 'application/json', 'response_schema': pydantic_model}
+    requests = [{'contents': [{'role': 'user', 'parts': [{'text': prompt}]}], 'config': config}
+                for prompt in prompts]
+
+    job = client.batches.create(model=model_name, src=requests,
+                                config={'display_name': display_name or f"ai-helper-{pydantic_model.__name__}"})
+    return job.name
+
+
+def _response_text(response) -> Optional[str]:
+    """
+    Text of the first candidate. Reads the parts directly, response.text model_dumps every part to
+    look for non-text fields, which is most of the cost on large batches.
+    """
+    if not response or not response.candidates or not response.candidates[0].content:
+        return None
+    texts = [part.text for part in response.candidates[0].content.parts or []
+             if isinstance(part.text, str) and not part.thought]
+    return ''.join(texts) if texts else None
+
+
+def get_batch_results(client, job_name: str,
+                      pydantic_model: Type[BaseModel]) -> Optional[List[BaseModel | Exception]]:
+    """
+    None while the job is still running. Once finished, results are returned in prompt order and
+    failed requests are returned as exceptions.
+    """
+    job = client.batches.get(name=job_name)
+    state = getattr(job.state, 'name', str(job.state))
+    if state not in BATCH_FINISHED_STATES:
+        return None
+
+    if job.dest is None or not job.dest.inlined_responses:
+        raise RuntimeError(f"Batch {job_name} finished with state {state} and no responses: {job.error}")
+
+    results = []
+    for inlined_response in job.dest.inlined_responses:
+        if inlined_response.error:
+            results.append(RuntimeError(f"Batch request failed: {inlined_response.error}"))
+            continue
+        text = _response_text(inlined_response.response)
+        if text is None:
+            results.append(RuntimeError("Batch request returned no text"))
+            continue
+        try:
+            results.append(pydantic_model.model_validate_json(text))
+        except ValidationError as e:
+            results.append(e)
+    return results
@@ -0,0 +1,34 @@
+from typing import Any, Callable, Hashable, Sequence
+
+
+"""
+Caches for values derived from objects that pydantic-ai and callers reuse between requests (tool
+schemas, attachments, tools, agent configs). These objects are often unhashable or expensive to
+hash, so their id is part of the key. Each entry keeps the objects themselves, which keeps their
+ids from being reused by other objects while cached. When full the cache is simply cleared.
+"""
+
+
+class IdentityCache:
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: dict = {}
+
+    def get(self, key_objects: Sequence[Any], extra_key: Hashable = None) -> Any:
+        """The cached value for these exact objects and extra key, None if there is none"""
+        cached = self._entries.get((tuple(id(obj) for obj in key_objects), extra_key))
+        if cached is not None and all(a is b for a, b in zip(cached[0], key_objects)):
+            return cached[1]
+        return None
+
+    def set(self, key_objects: Sequence[Any], extra_key: Hashable, value: Any):
+        if len(self._entries) >= self.max_size:
+            self._entries.clear()
+        self._entries[(tuple(id(obj) for obj in key_objects), extra_key)] = (tuple(key_objects), value)
+
+    def get_or_build(self, key_objects: Sequence[Any], extra_key: Hashable, build: Callable[[], Any]) -> Any:
+        value = self.get(key_objects, extra_key)
+        if value is None:
+            value = build()
+            self.set(key_objects, extra_key, value)
+        return value
@@ -0,0 +1,59 @@
+import io
+from typing import Tuple
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional, without it images are sent as they are
+    Image = ImageOps = None
+
+
+"""
+Downscales oversized images before they are sent to a model. Providers shrink large images on
+their side anyway (Anthropic to 1568px on the long edge), so sending them at full size only costs
+upload bandwidth and base64 encoding time on every request. Large opaque images are re-encoded
+as JPEG, which is several times smaller than PNG for photos.
+"""
+
+MAX_IMAGE_EDGE = 1568
+JPEG_THRESHOLD_BYTES = 512 * 1024
+JPEG_QUALITY = 85
+RESIZABLE_FORMATS = {'image/png': 'PNG', 'image/jpeg': 'JPEG', 'image/webp': 'WEBP'}
+
+
+def shrink_image(data: bytes, media_type: str, max_edge: int = MAX_IMAGE_EDGE) -> Tuple[bytes, str]:
+    """Returns the (possibly) downscaled image and its media type"""
+    image_format = RESIZABLE_FORMATS.get(media_type)
+    original_media_type = media_type
+    if Image is None or image_format is None:
+        return data, media_type
+
+    to_jpeg = len(data) > JPEG_THRESHOLD_BYTES
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            if max(image.size) <= max_edge and not to_jpeg:
+                return data, media_type
+
+            # JPEG can be decoded straight at a reduced scale, so decode and resize are one pass
+            image.draft('RGB', (max_edge, max_edge))
+            # Keep transparency, JPEG can't store it
+            to_jpeg = to_jpeg and image.mode in ('RGB', 'L', 'CMYK', 'YCbCr')
+            if max(image.size) <= max_edge and not to_jpeg:
+                return data, media_type
+
+            # Resizing and re-encoding drop EXIF, apply its orientation so phone photos stay upright
+            image = ImageOps.exif_transpose(image)
+            # thumbnail keeps the aspect ratio
+            image.thumbnail((max_edge, max_edge), Image.BILINEAR)
+            buffer = io.BytesIO()
+            if to_jpeg:
+                image.convert('RGB').save(buffer, format='JPEG', quality=JPEG_QUALITY)
+                media_type = 'image/jpeg'
+            else:
+                image.save(buffer, format=image_format)
+    except OSError:
+        return data, media_type
+
+    # Already well compressed images can come out larger, the original is the smaller upload then
+    if len(buffer.getvalue()) >= len(data):
+        return data, original_media_type
+    return buffer.getvalue(), media_type
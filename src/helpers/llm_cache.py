@@ -0,0 +1,139 @@
+import functools
+import hashlib
+import heapq
+import os
+import pickle
+import shelve
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from pydantic_core import to_json
+
+
+"""
+In-memory LRU cache for LLM results. Identical requests are answered without a network
+round-trip or token spend. Entries expire after ttl_seconds. DiskLLMCache keeps the entries
+between runs, which is where dev and test loops repeat the same requests.
+"""
+
+class LLMCache:
+    def __init__(self, maxsize: int = 1024, ttl_seconds: int = 3600):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict = OrderedDict()
+        # Shared by concurrent requests and by tools running in pydantic-ai's worker threads, the
+        # LRU reordering isn't safe to run from several threads at once
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(**parts) -> str:
+        """Stable SHA-256 key over the request parts"""
+        # pydantic-core serializes straight to bytes in Rust, the sorted keys keep the key stable
+        payload = to_json({name: parts[name] for name in sorted(parts)}, fallback=str)
+        return hashlib.sha256(payload).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            stored_at, value = entry
+            if time.time() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskLLMCache(LLMCache):
+    def __init__(self, path: str, maxsize: int = 1024, ttl_seconds: int = 86400):
+        super().__init__(maxsize=maxsize, ttl_seconds=ttl_seconds)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._entries = shelve.open(path)
+        # Storage times live in their own shelf, so expiry and eviction never unpickle cached results
+        self._index = shelve.open(path + '-index')
+        self._stored_at = dict(self._index.items())
+        # Entries written without an index entry (older cache files) could never expire or be evicted
+        for key in set(self._entries.keys()) - self._stored_at.keys():
+            del self._entries[key]
+        for key in self._stored_at.keys() - set(self._entries.keys()):
+            del self._index[key]
+            del self._stored_at[key]
+
+    def _delete(self, key: str):
+        # Shelf.pop would unpickle the value first
+        for shelf in (self._entries, self._index):
+            if key in shelf:
+                del shelf[key]
+        self._stored_at.pop(key, None)
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            stored_at = self._stored_at.get(key)
+            if stored_at is None:
+                return None
+            if time.time() - stored_at > self.ttl_seconds:
+                self._delete(key)
+                return None
+
+            try:
+                return self._entries[key]
+            except (pickle.UnpicklingError, AttributeError, ImportError, KeyError):
+                # The result's class was renamed or moved since it was stored
+                self._delete(key)
+                return None
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            stored_at = time.time()
+            self._entries[key] = value
+            self._index[key] = stored_at
+            self._stored_at[key] = stored_at
+            overflow = len(self._stored_at) - self.maxsize
+            if overflow > 0:
+                for entry_key in heapq.nsmallest(overflow, self._stored_at, key=self._stored_at.get):
+                    self._delete(entry_key)
+            self._entries.sync()
+            self._index.sync()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._index.clear()
+            self._stored_at.clear()
+
+    def close(self):
+        with self._lock:
+            self._entries.close()
+            self._index.close()
+
+
+@functools.lru_cache(maxsize=None)
+def _open_disk_cache(path: str) -> DiskLLMCache:
+    return DiskLLMCache(path)
+
+
+def get_disk_cache(path: str) -> DiskLLMCache:
+    """
+    One cache per file for the whole process. A shelf can't be opened twice (gdbm locks the file,
+    dumb dbm instances overwrite each other's index), so AiHelper instances share it.
+    """
+    return _open_disk_cache(os.path.abspath(path))
@@ -1,12 +1,21 @@
-import json
+import bisect
+import functools
+import logging
 import os
 import time
 import requests
+from pydantic_core import from_json, to_json
 from pydantic_ai.usage import Usage
 from tabulate import tabulate
 
 from .config_helper import ConfigHelper
 
+logger = logging.getLogger(__name__)
+
+# Completion price per million tokens: below 1 is cheap, below 4 medium, anything else expensive
+PRICE_CATEGORY_LIMITS = (1, 4)
+PRICE_CATEGORIES = ('cheap', 'medium', 'expensive')
+
 
 class LLMInfoProvider:
     def __init__(self):
@@ -73,18 +82,22 @@ class LLMInfoProvider:
     
     """
 
-    def _get_models_data(self, include_excluded=False) -> list:
+    # Every cost lookup goes through the model list, so models.json is parsed once per provider (usually
+    # already by _init_cost_info), with pydantic-core's parser which is several times faster than json
+    @functools.cached_property
+    def _models_file_data(self) -> dict:
         cache_file = "models.json"
         if not os.path.exists(cache_file):
             self._init_cost_info()
 
-        with open(cache_file, 'r') as f:
-            data = json.load(f)
+        with open(cache_file, 'rb') as f:
+            return from_json(f.read())
 
-        models = data.get('data', [])
+    def _get_models_data(self, include_excluded=False) -> list:
+        models = self._models_file_data.get('data', [])
 
         if not include_excluded:
-            excluded_models = self.config.get_config('excluded_models')
+            excluded_models = set(self.config.get_config('excluded_models'))
             models = [model for model in models if model['id'] not in excluded_models]
 
         return models
@@ -93,13 +106,8 @@ class LLMInfoProvider:
         """
         Returns a list of all available models.
         """
-        models = self._get_models_data()
-
-        if not include_excluded:
-            excluded_models = self.config.get_config('excluded_models')
-            models = [model for model in models if model['id'] not in excluded_models]
-
-        return [model['id'] for model in models]
+        # _get_models_data already drops the excluded models
+        return [model['id'] for model in self._get_models_data(include_excluded)]
 
     def get_price_list(self) -> dict:
         models = self._get_models_data()
@@ -108,19 +116,14 @@ class LLMInfoProvider:
         for model in models:
             pricing = model.get("pricing", {})
             model_id = model.get("id", "")
-            comparison_price = float(pricing.get("completion", 0))*1000000
-
-            if comparison_price < 1:
-                price_category = "cheap"
-            elif comparison_price < 4:
-                price_category = "medium"
-            else:
-                price_category = "expensive"
+            # The completion price sets the category as well, it is converted once
+            completion_price = float(pricing.get("completion", 0))*1000000
+            price_category = PRICE_CATEGORIES[bisect.bisect_right(PRICE_CATEGORY_LIMITS, completion_price)]
 
             price_list[model_id] = {
                 "price_category": price_category,
                 "prompt": round(float(pricing.get("prompt", 0))*1000000,2),
-                "completion": round(float(pricing.get("completion", 0))*1000000,2),
+                "completion": round(completion_price,2),
                 "request": round(float(pricing.get("request", 0))*1000000,2),
                 "image": round(float(pricing.get("image", 0))*1000000,2),
                 "web_search": round(float(pricing.get("web_search", 0))*1000000,2),
@@ -178,35 +181,37 @@ class LLMInfoProvider:
         for model in models:
             pricing = model.get("pricing", {})
 
-            if 'completion' in pricing and float(pricing['completion']) > 0:
-                cost = float(pricing['completion'])
-                if cost < start:
-                    start = cost
-                    cheapest_model = model['id']
+            cost = float(pricing.get('completion', 0))
+            if 0 < cost < start:
+                start = cost
+                cheapest_model = model['id']
 
         return cheapest_model
 
-    def get_model_info(self, model: str) -> dict | None:
-        models = self._get_models_data()
-
-        # read the model_mappings.json
+    # Cost lookups run after every request, so model_mappings.json is only read once
+    @functools.cached_property
+    def _model_mappings(self) -> dict:
         path = os.path.dirname(__file__)
         model_mappings_file = path+"/model_mappings.json"
 
+        if not os.path.exists(model_mappings_file):
+            return {}
+        with open(model_mappings_file, 'rb') as f:
+            return from_json(f.read())
 
-        if os.path.exists(model_mappings_file):
-            with open(model_mappings_file, 'r') as f:
-                model_mappings = json.load(f)
-            # check if model is in mappings
-            if model in model_mappings:
-                model = model_mappings[model]
+    # Cost lookups run after every request, so the models are indexed by id once instead of scanning
+    # the whole list. Reversed so the first entry wins for a duplicated id, as with a scan
+    @functools.cached_property
+    def _models_by_id(self) -> dict:
+        return {model['id']: model for model in reversed(self._models_file_data.get('data', []))}
 
-        result = list(filter(lambda x: x["id"] == model, models))
+    def get_model_info(self, model: str) -> dict | None:
+        # check if model is in mappings
+        model = self._model_mappings.get(model, model)
 
-        if not result:
+        if model in self.config.get_config('excluded_models'):
             return None
-
-        return result[0]
+        return self._models_by_id.get(model)
 
     def get_cost_info(self, model: str, usage: Usage) -> int:
         model_info = self.get_model_info(model)
@@ -215,12 +220,22 @@ class LLMInfoProvider:
 
         pricing = model_info.get("pricing", {})
         total_cost = 0
+        prompt_tokens = usage.request_tokens or 0
+
+        # Prompt cache reads/writes (Anthropic) are part of request_tokens but priced separately
+        details = usage.details or {}
+        for detail_key, price_key in (('cache_read_input_tokens', 'input_cache_read'),
+                                      ('cache_creation_input_tokens', 'input_cache_write')):
+            cache_tokens = details.get(detail_key, 0)
+            if cache_tokens > 0 and (price := pricing.get(price_key)) is not None:
+                total_cost += float(price) * cache_tokens
+                prompt_tokens -= cache_tokens
 
-        if 'prompt' in pricing and usage.request_tokens > 0:
-            total_cost += float(pricing['prompt']) * usage.request_tokens
+        if prompt_tokens > 0 and (price := pricing.get('prompt')) is not None:
+            total_cost += float(price) * prompt_tokens
 
-        if 'completion' in pricing and usage.response_tokens > 0:
-            total_cost += float(pricing['completion']) * usage.response_tokens
+        if (response_tokens := usage.response_tokens or 0) > 0 and (price := pricing.get('completion')) is not None:
+            total_cost += float(price) * response_tokens
 
         return round(total_cost, 10)
 
@@ -236,10 +251,12 @@ class LLMInfoProvider:
 
         # Check if cached data exists and is recent
         if os.path.exists(cache_file):
-            with open(cache_file, 'r') as f:
-                cache_data = json.load(f)
+            with open(cache_file, 'rb') as f:
+                cache_data = from_json(f.read())
                 cache_time = cache_data.get("timestamp", 0)
                 if time.time() - cache_time < cache_duration:
+                    # The model list is served from this parse as well
+                    self.__dict__['_models_file_data'] = cache_data
                     self._cost_info = {
                         "pydantic_model_cost": {},
                         "llm_model_cost": {},
@@ -252,7 +269,7 @@ class LLMInfoProvider:
         try:
             response = requests.get("https://openrouter.ai/api/v1/models")
             response.raise_for_status()
-            model_data = response.json().get("data", [])
+            model_data = from_json(response.content).get("data", [])
 
             # remove models that do not support tools
             model_data = [model for model in model_data if 'tools' in model.get('supported_parameters', [])]
@@ -262,8 +279,9 @@ class LLMInfoProvider:
                 "timestamp": time.time(),
                 "data": model_data
             }
-            with open(cache_file, 'w') as f:
-                json.dump(cache_data, f, indent=2)
+            with open(cache_file, 'wb') as f:
+                f.write(to_json(cache_data, indent=2))
+            self.__dict__['_models_file_data'] = cache_data
 
             self._cost_info = {
                 "pydantic_model_cost": {},
@@ -279,4 +297,4 @@ class LLMInfoProvider:
                 "total_cost": {"total": 0},
                 "model_data": []
             }
-            print(f"Failed to fetch cost data from OpenRouter API: {str(e)}")
+            logger.warning("Failed to fetch cost data from OpenRouter API: %s", e)
@@ -0,0 +1,80 @@
+from typing import List, Optional, Type
+
+from pydantic import BaseModel, ValidationError
+from pydantic_ai.profiles.openai import OpenAIJsonSchemaTransformer
+from pydantic_core import from_json, to_json
+
+
+"""
+OpenAI Batch API for requests that don't need an answer right away (bulk classification, model
+checks, evaluations). Batches are billed at half the per-token price, use a separate rate limit
+pool and finish within 24 hours. Like Gemini batches, they run on a single model without tools or
+the fallback chain, responses are requested as JSON matching the pydantic model and validated with it.
+"""
+
+BATCH_ENDPOINT = '/v1/chat/completions'
+BATCH_FINISHED_STATES = ('completed', 'failed', 'expired', 'cancelled')
+
+
+def _response_format(pydantic_model: Type[BaseModel]) -> dict:
+    # Same rewrite pydantic-ai applies to tool schemas, strict mode only if the schema allows it
+    transformer = OpenAIJsonSchemaTransformer(pydantic_model.model_json_schema(), strict=None)
+    schema = transformer.walk()
+    return {'type': 'json_schema', 'json_schema': {'name': pydantic_model.__name__, 'schema': schema,
+                                                   'strict': transformer.is_strict_compatible}}
+
+
+def submit_batch(client, prompts: List[str], pydantic_model: Type[BaseModel], model_name: str,
+                 display_name: Optional[str] = None) -> str:
+    """Uploads the prompts as one batch input file and returns the batch id to poll with get_batch_results"""
+    response_format = _response_format(pydantic_model)
+    lines = [to_json({'custom_id': str(index), 'method': 'POST', 'url': BATCH_ENDPOINT,
+                      'body': {'model': model_name, 'messages': [{'role': 'user', 'content': prompt}],
+                               'response_format': response_format}})
+             for index, prompt in enumerate(prompts)]
+
+    input_file = client.files.create(file=('batch.jsonl', b'\n'.join(lines)), purpose='batch')
+    batch = client.batches.create(input_file_id=input_file.id, endpoint=BATCH_ENDPOINT, completion_window='24h',
+                                  metadata={'description': display_name or f"ai-helper-{pydantic_model.__name__}"})
+    return batch.id
+
+
+def _parse_line(line: dict, pydantic_model: Type[BaseModel]) -> BaseModel | Exception:
+    response = line.get('response') or {}
+    if line.get('error') or response.get('status_code') != 200:
+        return RuntimeError(f"Batch request failed: {line.get('error') or response.get('body')}")
+
+    choices = response['body'].get('choices') or []
+    text = choices[0]['message'].get('content') if choices else None
+    if text is None:
+        return RuntimeError("Batch request returned no text")
+    try:
+        return pydantic_model.model_validate_json(text)
+    except ValidationError as e:
+        return e
+
+
+def get_batch_results(client, batch_id: str,
+                      pydantic_model: Type[BaseModel]) -> Optional[List[BaseModel | Exception]]:
+    """
+    None while the batch is still running. Once finished, results are returned in prompt order and
+    failed requests are returned as exceptions.
+    """
+    batch = client.batches.retrieve(batch_id)
+    if batch.status not in BATCH_FINISHED_STATES:
+        return None
+
+    if not batch.output_file_id and not batch.error_file_id:
+        raise RuntimeError(f"Batch {batch_id} finished with status {batch.status} and no responses: {batch.errors}")
+
+    # Output lines are not in input order, custom_id is the prompt index
+    results: List[BaseModel | Exception] = [RuntimeError("Batch request returned no response")] * \
+        batch.request_counts.total
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if not file_id:
+            continue
+        for raw_line in client.files.content(file_id).content.splitlines():
+            if raw_line.strip():
+                line = from_json(raw_line)
+                results[int(line['custom_id'])] = _parse_line(line, pydantic_model)
+    return results
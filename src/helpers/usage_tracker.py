@@ -7,18 +7,37 @@ from datetime import datetime, timedelta
 import uuid
 import os
 from pathlib import Path
-import json
-import mimetypes
+import logging
 from decimal import Decimal
 import re
 from collections import defaultdict
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
+from pydantic_core import from_json, to_json
 
 from src.py_models.base import LLMReport
 from pydantic_ai.usage import Usage
 from tabulate import tabulate
 
+logger = logging.getLogger(__name__)
+
+# Only whole JSON numbers in scientific notation in value position. Every float in the usage file is
+# an object value, so the match starts at the '": ' after the key. The literal prefix lets the regex
+# engine skip ahead instead of testing a lookbehind at every character, which dominated _save
+SCIENTIFIC_NUMBER_RE = re.compile(rb'(": )(-?\d+(?:\.\d+)?[eE][+-]?\d+)(?=[\s,\]}])')
+
+
+def _new_llm_totals() -> Dict[str, Any]:
+    return {'requests': 0, 'input_tokens': 0, 'output_tokens': 0, 'total_tokens': 0, 'cost': 0.0}
+
+
+def _add_llm_totals(totals: Dict[str, Any], item) -> None:
+    totals['requests'] += item.requests
+    totals['input_tokens'] += item.input_tokens
+    totals['output_tokens'] += item.output_tokens
+    totals['total_tokens'] += item.total_tokens
+    totals['cost'] += item.cost
+
 
 def format_usage_data(data: Dict[str, Any]) -> str:
     """
@@ -240,10 +259,10 @@ def format_usage_from_file(file_path: str) -> str:
         print(f"Warning: Usage file {file_path} not found. Displaying empty report structure.")
         empty_usage_data = HelperUsage().model_dump()
         return format_usage_data(empty_usage_data)
-    with open(file_path, 'r') as f:
+    with open(file_path, 'rb') as f:
         try:
-            data = json.load(f)
-        except json.JSONDecodeError:
+            data = from_json(f.read())
+        except ValueError:
             print(f"Error: Could not decode JSON from {file_path}. File might be corrupted or empty.")
             empty_usage_data = HelperUsage().model_dump()
             return format_usage_data(empty_usage_data)
@@ -299,42 +318,46 @@ class UsageTracker:
         if not os.path.exists(self.config_path):
             self._create_empty_usage_file()
         self.usage_data = self._load()
+        # Day the stored usage_today/usage_this_month totals were last summed for
+        self._totals_day: Optional[str] = None
 
     def _create_empty_usage_file(self):
         empty_usage = HelperUsage()
         os.makedirs(os.path.dirname(self.config_path), exist_ok=True)
         with open(self.config_path, 'w') as f:
-            json.dump(empty_usage.model_dump(exclude_none=True), f, indent=4)
+            f.write(empty_usage.model_dump_json(indent=4, exclude_none=True))
 
     def _load(self) -> HelperUsage:
         try:
-            with open(self.config_path, 'r') as f:
-                data = json.load(f)
-                # Ensure new fields exist with defaults if loading an old file
-                if 'daily_tool_usage' not in data:
-                    data['daily_tool_usage'] = []
-                # For UsageItem, Pydantic will use default for pydantic_model_name if missing
-                return HelperUsage(**data)
-        except (FileNotFoundError, json.JSONDecodeError):
-            print(f"Warning: usage.json not found or corrupted at {self.config_path}. Creating a new one.")
-            self._create_empty_usage_file()
-            return HelperUsage()
+            # Parse straight into the model with pydantic's JSON parser, missing fields
+            # (e.g. daily_tool_usage in old files) fall back to their defaults
+            with open(self.config_path, 'rb') as f:
+                return HelperUsage.model_validate_json(f.read())
+        except ValidationError as e:
+            # Only an unparseable file is replaced, schema errors should not wipe the usage history
+            if not any(error['type'] == 'json_invalid' for error in e.errors()):
+                raise
+        except FileNotFoundError:
+            pass
+
+        logger.warning("usage.json not found or corrupted at %s. Creating a new one.", self.config_path)
+        self._create_empty_usage_file()
+        return HelperUsage()
 
     def _save(self):
-        # Using model_dump for consistent serialization of Pydantic models
-        # Pydantic's default JSON encoder handles Decimal and float precision well.
-        # The regex was for extreme cases, let's simplify and rely on Pydantic first.
-        json_str = self.usage_data.model_dump_json(indent=4)
+        # Saved after every request. Same output as model_dump_json, but kept as bytes from the
+        # serializer to the file instead of decoding the whole file and encoding it again
+        json_bytes = to_json(self.usage_data, indent=4)
 
         # If scientific notation is still an issue with floats after Pydantic's dump:
         def replace_scientific(match):
-            num = float(match.group(0))
-            return f"{num:.8f}".rstrip('0').rstrip('.') if '.' in f"{num:.8f}" else f"{num:.8f}"
+            formatted = f"{float(match.group(2)):.8f}"
+            return match.group(1) + (formatted.rstrip('0').rstrip('.') if '.' in formatted else formatted).encode()
 
-        json_str = re.sub(r'\d+\.?\d*e[+-]?\d+', replace_scientific, json_str, flags=re.IGNORECASE)
+        json_bytes = SCIENTIFIC_NUMBER_RE.sub(replace_scientific, json_bytes)
 
-        with open(self.config_path, 'w') as f:
-            f.write(json_str)
+        with open(self.config_path, 'wb') as f:
+            f.write(json_bytes)
 
     def _update_fill_percentage_stats(self, pydantic_model_name: str, llm_model_name: str, fill_percentage: float):
         if pydantic_model_name not in self.usage_data.fill_percentage_by_pydantic_model:
@@ -387,7 +410,8 @@ class UsageTracker:
             existing_llm_item.requests += requests
             existing_llm_item.cost += cost
         else:
-            usage_item = UsageItem(
+            # Built from an already validated LLMReport, no need to validate again
+            usage_item = UsageItem.model_construct(
                 month=current_month,
                 day=current_day,
                 model=model_name,
@@ -402,23 +426,36 @@ class UsageTracker:
             self.usage_data.daily_usage.append(usage_item)
 
         if tool_names_called:
+            # Index today's tool items once instead of scanning the whole history for every call
+            today_tool_items = {item.tool_name: item for item in self.usage_data.daily_tool_usage
+                                if item.day == current_day}
             for tool_name in tool_names_called:
-                existing_tool_item = None
-                for item in self.usage_data.daily_tool_usage:
-                    if item.day == current_day and item.tool_name == tool_name:
-                        existing_tool_item = item
-                        break
+                existing_tool_item = today_tool_items.get(tool_name)
                 if existing_tool_item:
                     existing_tool_item.calls += 1
                 else:
-                    self.usage_data.daily_tool_usage.append(ToolUsageItem(
+                    # Built from an already validated LLMReport, no need to validate again
+                    tool_item = ToolUsageItem.model_construct(
                         month=current_month, day=current_day, tool_name=tool_name, calls=1
-                    ))
+                    )
+                    self.usage_data.daily_tool_usage.append(tool_item)
+                    today_tool_items[tool_name] = tool_item
 
-        self.usage_data.usage_today = self._calculate_usage_today()
-        self.usage_data.usage_this_month = self._calculate_usage_this_month()
+        self._update_totals(current_day, cost)
         self._save()
 
+    def _update_totals(self, current_day: str, cost: float):
+        # The history is summed once per day (the stored totals may be from an earlier one),
+        # after that each request's reported cost is added to the running totals
+        if self._totals_day != current_day:
+            self._totals_day = current_day
+            self.usage_data.usage_today = self._calculate_usage_today()
+            self.usage_data.usage_this_month = self._calculate_usage_this_month()
+            return
+
+        self.usage_data.usage_today += cost
+        self.usage_data.usage_this_month += cost
+
     def _calculate_usage_today(self) -> float:
         today = datetime.now().strftime("%Y-%m-%d")
         return sum(item.cost for item in self.usage_data.daily_usage if item.day == today)
@@ -441,93 +478,47 @@ class UsageTracker:
         summary['usage_today'] = self.get_usage_today()
         summary['usage_this_month'] = self.get_usage_this_month()
 
-        # --- Daily Summaries (Aggregated for Report) ---
-        # Aggregate daily LLM usage by day, model, service, and pydantic model
-        daily_llm_summary_aggregated = defaultdict(
-            lambda: {'day': '', 'model': '', 'service': '', 'pydantic_model_name': '', 'requests': 0, 'input_tokens': 0, 'output_tokens': 0, 'total_tokens': 0, 'cost': 0.0})
+        # --- Daily, Monthly and All-Time Aggregations ---
+        # One pass over the LLM history feeds every aggregation, each entry is looked up once per item
+        daily_llm_summary = {}
+        monthly_llm_summary = defaultdict(_new_llm_totals)
+        by_model = defaultdict(_new_llm_totals)
+        by_service = defaultdict(_new_llm_totals)
+        usage_by_pydantic_model = defaultdict(_new_llm_totals)
         for item in self.usage_data.daily_usage:
             key = (item.day, item.model, item.service, item.pydantic_model_name)
-            daily_llm_summary_aggregated[key]['day'] = item.day
-            daily_llm_summary_aggregated[key]['model'] = item.model
-            daily_llm_summary_aggregated[key]['service'] = item.service
-            daily_llm_summary_aggregated[key]['pydantic_model_name'] = item.pydantic_model_name
-            daily_llm_summary_aggregated[key]['requests'] += item.requests
-            daily_llm_summary_aggregated[key]['input_tokens'] += item.input_tokens
-            daily_llm_summary_aggregated[key]['output_tokens'] += item.output_tokens
-            daily_llm_summary_aggregated[key]['total_tokens'] += item.total_tokens
-            daily_llm_summary_aggregated[key]['cost'] += item.cost
-        summary['daily_usage'] = list(daily_llm_summary_aggregated.values())
-
-
-        # Aggregate daily tool usage by day and tool name
-        daily_tool_summary_aggregated = defaultdict(lambda: {'day': '', 'tool_name': '', 'calls': 0})
+            daily = daily_llm_summary.get(key)
+            if daily is None:
+                daily = daily_llm_summary[key] = {'day': item.day, 'model': item.model, 'service': item.service,
+                                                  'pydantic_model_name': item.pydantic_model_name,
+                                                  **_new_llm_totals()}
+            _add_llm_totals(daily, item)
+            _add_llm_totals(monthly_llm_summary[item.month], item)
+            _add_llm_totals(by_model[item.model], item)
+            _add_llm_totals(by_service[item.service], item)
+            # "N/A" means no pydantic model was recorded, it is not a category of its own
+            if item.pydantic_model_name != "N/A":
+                _add_llm_totals(usage_by_pydantic_model[item.pydantic_model_name], item)
+
+        daily_tool_summary = {}
+        monthly_tool_summary = defaultdict(lambda: {'total_calls': 0})
+        by_tool = defaultdict(lambda: {'calls': 0})
         for item in self.usage_data.daily_tool_usage:
             key = (item.day, item.tool_name)
-            daily_tool_summary_aggregated[key]['day'] = item.day
-            daily_tool_summary_aggregated[key]['tool_name'] = item.tool_name
-            daily_tool_summary_aggregated[key]['calls'] += item.calls
-        summary['daily_tool_usage'] = list(daily_tool_summary_aggregated.values())
-
+            daily = daily_tool_summary.get(key)
+            if daily is None:
+                daily = daily_tool_summary[key] = {'day': item.day, 'tool_name': item.tool_name, 'calls': 0}
+            daily['calls'] += item.calls
+            monthly_tool_summary[item.month]['total_calls'] += item.calls
+            by_tool[item.tool_name]['calls'] += item.calls
 
-        # --- Monthly Summaries ---
-        monthly_llm_summary = defaultdict(
-            lambda: {'requests': 0, 'input_tokens': 0, 'output_tokens': 0, 'total_tokens': 0, 'cost': 0.0})
-        for item in self.usage_data.daily_usage:
-            month_key = item.month
-            monthly_llm_summary[month_key]['requests'] += item.requests
-            monthly_llm_summary[month_key]['input_tokens'] += item.input_tokens
-            monthly_llm_summary[month_key]['output_tokens'] += item.output_tokens
-            monthly_llm_summary[month_key]['total_tokens'] += item.total_tokens
-            monthly_llm_summary[month_key]['cost'] += item.cost
+        summary['daily_usage'] = list(daily_llm_summary.values())
+        summary['daily_tool_usage'] = list(daily_tool_summary.values())
         summary['monthly_llm_summary'] = dict(monthly_llm_summary)
-
-        monthly_tool_summary = defaultdict(lambda: {'total_calls': 0})
-        for item in self.usage_data.daily_tool_usage:
-            month_key = item.month
-            monthly_tool_summary[month_key]['total_calls'] += item.calls
         summary['monthly_tool_summary'] = dict(monthly_tool_summary)
-
-        # --- All-Time Aggregations ---
-        # By LLM Model
-        by_model = defaultdict(
-            lambda: {'requests': 0, 'input_tokens': 0, 'output_tokens': 0, 'total_tokens': 0, 'cost': 0.0})
-        for item in self.usage_data.daily_usage:
-            by_model[item.model]['requests'] += item.requests
-            by_model[item.model]['input_tokens'] += item.input_tokens
-            by_model[item.model]['output_tokens'] += item.output_tokens
-            by_model[item.model]['total_tokens'] += item.total_tokens
-            by_model[item.model]['cost'] += item.cost
         summary['by_model'] = dict(by_model)
-
-        # By LLM Service
-        by_service = defaultdict(
-            lambda: {'requests': 0, 'input_tokens': 0, 'output_tokens': 0, 'total_tokens': 0, 'cost': 0.0})
-        for item in self.usage_data.daily_usage:
-            by_service[item.service]['requests'] += item.requests
-            by_service[item.service]['input_tokens'] += item.input_tokens
-            by_service[item.service]['output_tokens'] += item.output_tokens
-            by_service[item.service]['total_tokens'] += item.total_tokens
-            by_service[item.service]['cost'] += item.cost
         summary['by_service'] = dict(by_service)
-
-        # By Pydantic Model (for LLM usage)
-        usage_by_pydantic_model = defaultdict(
-            lambda: {'requests': 0, 'input_tokens': 0, 'output_tokens': 0, 'total_tokens': 0, 'cost': 0.0})
-        for item in self.usage_data.daily_usage:
-            # Only include if pydantic_model_name is not "N/A" or if you want to see "N/A" as a category
-            if item.pydantic_model_name != "N/A":
-                key = item.pydantic_model_name
-                usage_by_pydantic_model[key]['requests'] += item.requests
-                usage_by_pydantic_model[key]['input_tokens'] += item.input_tokens
-                usage_by_pydantic_model[key]['output_tokens'] += item.output_tokens
-                usage_by_pydantic_model[key]['total_tokens'] += item.total_tokens
-                usage_by_pydantic_model[key]['cost'] += item.cost
         summary['usage_by_pydantic_model'] = dict(usage_by_pydantic_model)
-
-        # By Tool Name
-        by_tool = defaultdict(lambda: {'calls': 0})
-        for item in self.usage_data.daily_tool_usage:
-            by_tool[item.tool_name]['calls'] += item.calls
         summary['by_tool'] = dict(by_tool)
 
         # Fill Percentage Stats (passing the actual objects)
@@ -0,0 +1,45 @@
+import functools
+import re
+from typing import Type
+
+import yaml
+from pydantic import BaseModel, ValidationError
+from pydantic_ai import ModelRetry, TextOutput
+
+
+"""
+YAML structured output. Models spend noticeably fewer completion tokens on YAML than on JSON
+(no quoted keys, braces or commas), so responses are faster and cheaper. The model is asked for a
+plain YAML document and the text is parsed and validated here, invalid output is sent back for a retry.
+"""
+
+CODE_FENCE_RE = re.compile(r'^```(?:ya?ml)?[ \t]*\n(.*?)\n?```$', re.DOTALL | re.IGNORECASE)
+
+# libyaml's C parser is several times faster than the pure Python one on every response
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+@functools.lru_cache(maxsize=64)
+def yaml_instructions(pydantic_model: Type[BaseModel]) -> str:
+    """Instructions telling the model to answer in YAML matching the model's schema, built once per model"""
+    schema = yaml.safe_dump(pydantic_model.model_json_schema(), sort_keys=False)
+    return ("Respond only with a YAML document, without any other text, that matches this JSON schema:\n"
+            f"{schema}")
+
+
+def yaml_output(pydantic_model: Type[BaseModel]) -> TextOutput:
+    """Output type for pydantic-ai Agents that parses the model's YAML text into pydantic_model"""
+    def parse_yaml(text: str):
+        text = text.strip()
+        # Only fenced responses need the regex
+        if text.startswith('```'):
+            match = CODE_FENCE_RE.match(text)
+            if match:
+                text = match.group(1)
+
+        try:
+            return pydantic_model.model_validate(yaml.load(text, Loader=YAML_LOADER))
+        except (yaml.YAMLError, ValidationError) as e:
+            raise ModelRetry(f"Response is not valid YAML for {pydantic_model.__name__}: {e}")
+
+    return TextOutput(parse_yaml)
@@ -17,6 +17,7 @@ class LLMReport(BaseModel):
     fill_percentage: int = 0
     fallback_used: bool = False
     attempted_models: List[str] = Field(default_factory=list)
+    cached: bool = False
 
 class BasePyModel(BaseModel):
     """
@@ -45,24 +46,18 @@ class BasePyModel(BaseModel):
         if not isinstance(data, dict):
             return data
 
-        # Create a clean copy with only valid fields
-        clean_data = {}
-
         # Get fields to skip
         skip_fields = cls.get_skip_fields()
-
-        for field_name, field_value in data.items():
-            # Skip fields that are explicitly defined to be skipped
-            if field_name in skip_fields:
-                continue
-
-            # Skip fields that don't exist in the model
-            if field_name not in cls.model_fields:  # Use __fields__ for Pydantic v1
-                continue
-
-            # Add the field to clean data
-            clean_data[field_name] = field_value
-
-        # Return a model instance
-        return cls(**clean_data)
-
+        clean_data = {name: value for name, value in data.items() if name not in skip_fields}
+
+        # Validate the whole payload in one pass, LLM output is usually valid as is
+        try:
+            return cls.model_validate(clean_data)
+        except ValidationError as e:
+            # Drop the fields that failed and validate the rest once more, missing required
+            # fields (and model level errors) can't be fixed by dropping and still raise
+            failed_fields = {error['loc'][0] for error in e.errors() if error['loc']} & clean_data.keys()
+            if not failed_fields:
+                raise
+
+        return cls.model_validate({name: value for name, value in clean_data.items() if name not in failed_fields})
@@ -1,12 +1,3 @@
-import os
-from typing import Dict, Any
-
-import requests
-from dotenv import load_dotenv
-from pydantic_ai import Agent, RunContext
-
-load_dotenv()
-
 def calculator(expression: str) -> float:
     """A simple calculator that can add, subtract, multiply, and divide."""
     try:
@@ -1,30 +1,21 @@
-import os
 from datetime import datetime
-from typing import Dict, Any
 
-import requests
-from dotenv import load_dotenv
-from pydantic_ai import Agent, RunContext
+# Lookup tables indexed by hour (0-23) and day of month (1-31)
+TIME_OF_DAY = ('night',) * 5 + ('morning',) * 7 + ('afternoon',) * 5 + ('evening',) * 4 + ('night',) * 3
+ORDINAL_SUFFIX = ('',) + tuple(
+    'th' if 11 <= day <= 13 else {1: 'st', 2: 'nd', 3: 'rd'}.get(day % 10, 'th') for day in range(1, 32)
+)
 
-load_dotenv()
 
 def tool_get_human_date() -> str:
     dt = datetime.now()
 
     # Get ordinal suffix
     day = dt.day
-    suffix = 'th' if 11 <= day <= 13 else {1: 'st', 2: 'nd', 3: 'rd'}.get(day % 10, 'th')
+    suffix = ORDINAL_SUFFIX[day]
 
     # Determine time of day
-    hour = dt.hour
-    if 5 <= hour < 12:
-        time_of_day = "morning"
-    elif 12 <= hour < 17:
-        time_of_day = "afternoon"
-    elif 17 <= hour < 21:
-        time_of_day = "evening"
-    else:
-        time_of_day = "night"
+    time_of_day = TIME_OF_DAY[dt.hour]
 
     # Check if today
     today = datetime.now().date()
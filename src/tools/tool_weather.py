@@ -1,11 +1,35 @@
 import os
+import threading
 from typing import Dict, Any
 
 import requests
 from dotenv import load_dotenv
 
+from helpers.llm_cache import LLMCache
+
 load_dotenv()
 
+WEATHER_API_URL = "http://api.weatherapi.com/v1/current.json"
+WEATHER_API_TIMEOUT = 10
+# The API refreshes current conditions every 15 minutes
+WEATHER_CACHE_SECONDS = 600
+
+# Models often repeat the same call within a run and model checks ask every model about the same
+# location, those are answered without another round-trip
+_weather_cache = LLMCache(maxsize=128, ttl_seconds=WEATHER_CACHE_SECONDS)
+
+
+# pydantic-ai runs sync tools in worker threads and requests.Session isn't thread-safe
+_local = threading.local()
+
+
+def _get_session() -> requests.Session:
+    """Tool calls on a thread share one session, so the connection to the weather API stays open between them"""
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = _local.session = requests.Session()
+    return session
+
 
 def tool_get_weather(location: str = 'Sofia, Bulgaria') -> Dict[str, Any]:
     """A tool to get the current weather information."""
@@ -14,7 +38,10 @@ def tool_get_weather(location: str = 'Sofia, Bulgaria') -> Dict[str, Any]:
     if not api_key:
         raise Exception("WEATHER_API_KEY environment variable is not set")
 
-    url = "http://api.weatherapi.com/v1/current.json"
+    cached = _weather_cache.get(location)
+    if cached is not None:
+        return dict(cached)
+
     params = {
         'key': api_key,
         'q': location,
@@ -22,7 +49,7 @@ def tool_get_weather(location: str = 'Sofia, Bulgaria') -> Dict[str, Any]:
     }
 
     try:
-        response = requests.get(url, params=params)
+        response = _get_session().get(WEATHER_API_URL, params=params, timeout=WEATHER_API_TIMEOUT)
 
         if response.status_code != 200:
             error_data = response.json()
@@ -37,7 +64,8 @@ def tool_get_weather(location: str = 'Sofia, Bulgaria') -> Dict[str, Any]:
             'conditions': data['current']['condition']['text']
         }
 
-        return result
+        _weather_cache.set(location, result)
+        return dict(result)
 
     except requests.RequestException as e:
         raise Exception(f"Failed to fetch weather data: {str(e)}")
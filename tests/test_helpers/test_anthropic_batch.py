@@ -0,0 +1,69 @@
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from pydantic import BaseModel, ValidationError
+
+from helpers.anthropic_batch import submit_batch, get_batch_results
+
+
+class SimpleTestModel(BaseModel):
+    field1: str
+    field2: int
+
+
+def succeeded(custom_id, tool_input):
+    message = SimpleNamespace(content=[SimpleNamespace(type='tool_use', input=tool_input)])
+    return SimpleNamespace(custom_id=custom_id, result=SimpleNamespace(type='succeeded', message=message))
+
+
+def failed(custom_id, result_type='errored'):
+    return SimpleNamespace(custom_id=custom_id, result=SimpleNamespace(type=result_type, error='overloaded'))
+
+
+def finished_batch(succeeded_count, errored_count=0):
+    counts = SimpleNamespace(processing=0, succeeded=succeeded_count, errored=errored_count, canceled=0, expired=0)
+    return SimpleNamespace(processing_status='ended', request_counts=counts)
+
+
+class TestAnthropicBatch(unittest.TestCase):
+
+    def test_submit_batch_requests_output_tool_per_prompt(self):
+        client = MagicMock()
+        client.messages.batches.create.return_value = SimpleNamespace(id='msgbatch_123')
+
+        batch_id = submit_batch(client, ['first', 'second'], SimpleTestModel, 'claude-3-5-haiku-latest')
+
+        self.assertEqual(batch_id, 'msgbatch_123')
+        requests = client.messages.batches.create.call_args.kwargs['requests']
+        self.assertEqual([request['custom_id'] for request in requests], ['0', '1'])
+        self.assertEqual([request['params']['messages'][0]['content'] for request in requests], ['first', 'second'])
+        params = requests[0]['params']
+        self.assertEqual(params['model'], 'claude-3-5-haiku-latest')
+        self.assertEqual(params['tools'][0]['input_schema']['required'], ['field1', 'field2'])
+        self.assertEqual(params['tool_choice'], {'type': 'tool', 'name': params['tools'][0]['name']})
+
+    def test_get_batch_results_is_none_while_running(self):
+        client = MagicMock()
+        client.messages.batches.retrieve.return_value = SimpleNamespace(processing_status='in_progress')
+        self.assertIsNone(get_batch_results(client, 'msgbatch_123', SimpleTestModel))
+
+    def test_get_batch_results_parses_responses_in_prompt_order(self):
+        client = MagicMock()
+        client.messages.batches.retrieve.return_value = finished_batch(3, errored_count=1)
+        client.messages.batches.results.return_value = iter([
+            succeeded('2', {'field1': 'c'}),
+            failed('1'),
+            succeeded('0', {'field1': 'a', 'field2': 1}),
+        ])
+
+        first, second, third, fourth = get_batch_results(client, 'msgbatch_123', SimpleTestModel)
+
+        self.assertEqual(first, SimpleTestModel(field1='a', field2=1))
+        self.assertIsInstance(second, RuntimeError)
+        self.assertIsInstance(third, ValidationError)
+        self.assertIsInstance(fourth, RuntimeError)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+from unittest.mock import patch
+
+from pydantic_ai.models import ModelRequestParameters
+from pydantic_ai.providers.anthropic import AnthropicProvider
+from pydantic_ai.tools import ToolDefinition
+
+from helpers.cached_anthropic_model import CachedAnthropicModel
+
+
+def tool_definition(name: str) -> ToolDefinition:
+    return ToolDefinition(name=name, description=f'{name} tool',
+                          parameters_json_schema={'type': 'object', 'properties': {}})
+
+
+class TestCachedAnthropicModel(unittest.TestCase):
+
+    def setUp(self):
+        self.model = CachedAnthropicModel('claude-3-5-sonnet-latest', provider=AnthropicProvider(api_key='fake_key'))
+
+    def test_last_tool_is_cache_breakpoint(self):
+        parameters = ModelRequestParameters(function_tools=[tool_definition('tool_a')],
+                                            output_tools=[tool_definition('final_result')])
+        tools = self.model._get_tools(parameters)
+
+        self.assertEqual([tool['name'] for tool in tools], ['tool_a', 'final_result'])
+        self.assertNotIn('cache_control', tools[0])
+        self.assertEqual(tools[-1]['cache_control'], {'type': 'ephemeral'})
+
+    def test_tool_params_are_translated_once(self):
+        schema = {'type': 'object', 'properties': {'city': {'type': 'string'}}}
+
+        def parameters():
+            # pydantic-ai creates new definitions per request but reuses the schema object
+            return ModelRequestParameters(function_tools=[ToolDefinition(name='tool_cached', description='cached',
+                                                                         parameters_json_schema=schema)])
+
+        with patch.object(CachedAnthropicModel, '_map_tool_definition',
+                          wraps=CachedAnthropicModel._map_tool_definition) as mock_map:
+            first = self.model._get_tools(parameters())
+            second = self.model._get_tools(parameters())
+
+        mock_map.assert_called_once()
+        self.assertEqual(first, second)
+        self.assertEqual(first[0]['input_schema'], schema)
+
+    def test_no_tools(self):
+        self.assertEqual(self.model._get_tools(ModelRequestParameters()), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import asyncio
+import base64
+import unittest
+from unittest.mock import patch
+
+from pydantic_ai.messages import BinaryContent, UserPromptPart
+from pydantic_ai.models import ModelRequestParameters
+from pydantic_ai.models.openai import OpenAIModel
+from pydantic_ai.providers.openai import OpenAIProvider
+from pydantic_ai.tools import ToolDefinition
+
+from helpers.cached_openai_model import CachedOpenAIModel
+
+
+class TestCachedOpenAIModel(unittest.TestCase):
+
+    def setUp(self):
+        self.model = CachedOpenAIModel('gpt-4o', provider=OpenAIProvider(api_key='fake_key'))
+
+    def test_tool_params_are_translated_once(self):
+        schema = {'type': 'object', 'properties': {'city': {'type': 'string'}}}
+        tool_def = ToolDefinition(name='get_weather', description='Weather', parameters_json_schema=schema, strict=True)
+        parameters = ModelRequestParameters(function_tools=[tool_def])
+
+        first = self.model._get_tools(parameters)
+        second = self.model._get_tools(parameters)
+
+        self.assertIs(first[0], second[0])
+        self.assertEqual(first, OpenAIModel._get_tools(self.model, parameters))
+        self.assertTrue(first[0]['function']['strict'])
+
+    def test_attachment_is_encoded_once(self):
+        image = BinaryContent(data=b'image bytes', media_type='image/png')
+        part = UserPromptPart(content=["Describe this image", image])
+
+        with patch('pydantic_ai.models.openai.base64.b64encode', wraps=base64.b64encode) as mock_b64encode:
+            first = asyncio.run(CachedOpenAIModel._map_user_prompt(part))
+            second = asyncio.run(CachedOpenAIModel._map_user_prompt(part))
+
+        mock_b64encode.assert_called_once()
+        self.assertEqual(first, second)
+
+    def test_matches_uncached_mapping(self):
+        part = UserPromptPart(content=["Compare these", BinaryContent(data=b'%PDF', media_type='application/pdf'),
+                                       BinaryContent(data=b'image bytes', media_type='image/png')])
+
+        cached = asyncio.run(CachedOpenAIModel._map_user_prompt(part))
+        uncached = asyncio.run(OpenAIModel._map_user_prompt(part))
+
+        self.assertEqual(cached, uncached)
+
+    def test_text_prompt_is_unchanged(self):
+        part = UserPromptPart(content="Hello")
+
+        self.assertEqual(asyncio.run(CachedOpenAIModel._map_user_prompt(part)),
+                         asyncio.run(OpenAIModel._map_user_prompt(part)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+from unittest.mock import patch
+
+from pydantic_ai._output import OutputObjectDefinition
+from pydantic_ai.models import Model, ModelRequestParameters
+from pydantic_ai.profiles.openai import OpenAIJsonSchemaTransformer
+from pydantic_ai.providers.openai import OpenAIProvider
+from pydantic_ai.tools import ToolDefinition
+
+from helpers.cached_openai_model import CachedOpenAIModel
+from helpers.identity_cache import IdentityCache
+
+
+class TestCachedSchemaModel(unittest.TestCase):
+
+    def setUp(self):
+        self.model = CachedOpenAIModel('gpt-4o', provider=OpenAIProvider(api_key='fake_key'))
+
+    def test_tool_schemas_are_rewritten_once(self):
+        schema = {'type': 'object', 'properties': {'city': {'type': 'string'}}, 'required': ['city'],
+                  'additionalProperties': False}
+
+        def parameters():
+            # pydantic-ai creates new definitions per request but reuses the schema object
+            return ModelRequestParameters(function_tools=[ToolDefinition(name='tool_cached', description='cached',
+                                                                         parameters_json_schema=schema)])
+
+        with patch.object(OpenAIJsonSchemaTransformer, 'walk', autospec=True,
+                          side_effect=OpenAIJsonSchemaTransformer.walk) as mock_walk:
+            first = self.model.customize_request_parameters(parameters())
+            second = self.model.customize_request_parameters(parameters())
+
+        mock_walk.assert_called_once()
+        self.assertEqual(first.function_tools, second.function_tools)
+        self.assertTrue(first.function_tools[0].strict)
+
+    def test_matches_uncached_customization(self):
+        schema = {'type': 'object', 'properties': {'days': {'type': 'integer', 'default': 1}}}
+        parameters = ModelRequestParameters(
+            function_tools=[ToolDefinition(name='forecast', description='', parameters_json_schema=schema)],
+            output_tools=[ToolDefinition(name='final_result', description='', parameters_json_schema=schema,
+                                         strict=False)])
+
+        cached = self.model.customize_request_parameters(parameters)
+        with patch('helpers.cached_schema_model._tool_schema_cache', IdentityCache(256)):
+            uncached = super(CachedOpenAIModel, self.model).customize_request_parameters(parameters)
+
+        self.assertEqual(cached, uncached)
+
+    def test_native_output_keeps_tool_schemas_cached(self):
+        schema = {'type': 'object', 'properties': {'city': {'type': 'string'}}, 'required': ['city']}
+        output_schema = {'type': 'object', 'properties': {'days': {'type': 'integer', 'default': 1}}}
+
+        def parameters():
+            return ModelRequestParameters(
+                function_tools=[ToolDefinition(name='native_tool', description='', parameters_json_schema=schema)],
+                output_mode='native', output_object=OutputObjectDefinition(json_schema=output_schema, name='Forecast'))
+
+        with patch.object(OpenAIJsonSchemaTransformer, 'walk', autospec=True,
+                          side_effect=OpenAIJsonSchemaTransformer.walk) as mock_walk:
+            first = self.model.customize_request_parameters(parameters())
+            second = self.model.customize_request_parameters(parameters())
+
+        # The tool schema once, the output object on every request
+        self.assertEqual(mock_walk.call_count, 3)
+        self.assertEqual(first, second)
+        self.assertEqual(first, Model.customize_request_parameters(self.model, parameters()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -69,12 +69,11 @@ class TestCliHelperFunctions(unittest.TestCase):
         patcher_print = patch('builtins.print')
         self.mock_print = patcher_print.start()
 
-        # Patch test_weather - This is the core function being tested indirectly.
+        # Simulated test_weather run per model - the batch below answers each request with it.
         # To test flag_non_working_models without mocking test_weather, we would need
         # a real test_weather function that interacts with real LLMs, which is not feasible.
         # Therefore, I will simulate the behavior of test_weather.
-        patcher_test_weather = patch('helpers.cli_helper_functions.test_weather')
-        self.mock_test_weather = patcher_test_weather.start()
+        self.mock_test_weather = MagicMock()
 
         # Configure the mock test_weather to simulate different outcomes
         def mock_test_weather_side_effect(model_name, provider):
@@ -106,6 +105,21 @@ class TestCliHelperFunctions(unittest.TestCase):
 
         self.mock_test_weather.side_effect = mock_test_weather_side_effect
 
+        # The models are checked as one batch, each request is answered by the simulated test_weather
+        def mock_get_results(requests):
+            outcomes = []
+            for request in requests:
+                try:
+                    outcomes.append(self.mock_test_weather(model_name=request['llm_model_name'],
+                                                           provider=request['provider']))
+                except Exception as e:
+                    outcomes.append(e)
+            return outcomes
+
+        patcher_ai_helper = patch('helpers.cli_helper_functions.AiHelper')
+        self.mock_ai_helper_class = patcher_ai_helper.start()
+        self.mock_ai_helper_class.return_value.get_results.side_effect = mock_get_results
+
 
     def tearDown(self):
         # Clean up the dummy config file and report file
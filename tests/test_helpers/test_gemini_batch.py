@@ -0,0 +1,70 @@
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from pydantic import BaseModel, ValidationError
+
+from helpers.gemini_batch import submit_batch, get_batch_results
+
+
+class SimpleTestModel(BaseModel):
+    field1: str
+    field2: int
+
+
+def inlined_response(*texts, error=None):
+    parts = [SimpleNamespace(text=text, thought=None) for text in texts]
+    response = SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=parts))]) if texts else None
+    return SimpleNamespace(response=response, error=error)
+
+
+class TestGeminiBatch(unittest.TestCase):
+
+    def test_submit_batch_sends_inline_json_requests(self):
+        client = MagicMock()
+        client.batches.create.return_value = SimpleNamespace(name='batches/123')
+
+        job_name = submit_batch(client, ['first', 'second'], SimpleTestModel, 'gemini-2.5-flash')
+
+        self.assertEqual(job_name, 'batches/123')
+        kwargs = client.batches.create.call_args.kwargs
+        self.assertEqual(kwargs['model'], 'gemini-2.5-flash')
+        self.assertEqual([request['contents'][0]['parts'][0]['text'] for request in kwargs['src']], ['first', 'second'])
+        self.assertIs(kwargs['src'][0]['config']['response_schema'], SimpleTestModel)
+        self.assertEqual(kwargs['src'][0]['config']['response_mime_type'], 'application/json')
+        self.assertIs(kwargs['src'][0]['config'], kwargs['src'][1]['config'])
+
+    def test_get_batch_results_is_none_while_running(self):
+        client = MagicMock()
+        client.batches.get.return_value = SimpleNamespace(state=SimpleNamespace(name='JOB_STATE_RUNNING'))
+        self.assertIsNone(get_batch_results(client, 'batches/123', SimpleTestModel))
+
+    def test_get_batch_results_parses_responses_in_order(self):
+        client = MagicMock()
+        client.batches.get.return_value = SimpleNamespace(
+            state=SimpleNamespace(name='JOB_STATE_SUCCEEDED'),
+            dest=SimpleNamespace(inlined_responses=[
+                inlined_response('{"field1": "a", "field2": 1}'),
+                inlined_response(error='quota exceeded'),
+                inlined_response('{"field1": "c"}'),
+                inlined_response('{"field1": "d",', ' "field2": 4}'),
+            ]),
+        )
+
+        first, second, third, fourth = get_batch_results(client, 'batches/123', SimpleTestModel)
+
+        self.assertEqual(first, SimpleTestModel(field1='a', field2=1))
+        self.assertIsInstance(second, RuntimeError)
+        self.assertIsInstance(third, ValidationError)
+        self.assertEqual(fourth, SimpleTestModel(field1='d', field2=4))
+
+    def test_get_batch_results_failed_job_raises(self):
+        client = MagicMock()
+        client.batches.get.return_value = SimpleNamespace(state=SimpleNamespace(name='JOB_STATE_FAILED'), dest=None,
+                                                          error='invalid request')
+        with self.assertRaises(RuntimeError):
+            get_batch_results(client, 'batches/123', SimpleTestModel)
+
+
+if __name__ == '__main__':
+    unittest.main()
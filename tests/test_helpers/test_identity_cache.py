@@ -0,0 +1,38 @@
+import unittest
+from unittest.mock import MagicMock
+
+from helpers.identity_cache import IdentityCache
+
+
+class TestIdentityCache(unittest.TestCase):
+
+    def test_builds_once_per_object(self):
+        cache = IdentityCache(8)
+        schema = {'type': 'object'}
+        build = MagicMock(return_value='built')
+
+        self.assertEqual(cache.get_or_build((schema,), 'tool', build), 'built')
+        self.assertEqual(cache.get_or_build((schema,), 'tool', build), 'built')
+        build.assert_called_once()
+
+    def test_equal_objects_and_extra_keys_are_separate_entries(self):
+        cache = IdentityCache(8)
+        first, second = {'type': 'object'}, {'type': 'object'}
+
+        cache.set((first,), 'tool', 'first')
+        self.assertIsNone(cache.get((second,), 'tool'))
+        self.assertIsNone(cache.get((first,), 'other_tool'))
+        self.assertEqual(cache.get((first,), 'tool'), 'first')
+
+    def test_cleared_when_full(self):
+        cache = IdentityCache(2)
+        objects = [object() for _ in range(3)]
+        for index, obj in enumerate(objects):
+            cache.set((obj,), None, index)
+
+        self.assertIsNone(cache.get((objects[0],)))
+        self.assertEqual(cache.get((objects[2],)), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
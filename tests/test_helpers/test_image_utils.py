@@ -0,0 +1,91 @@
+import io
+import os
+import unittest
+from unittest.mock import patch
+
+from helpers.image_utils import shrink_image, MAX_IMAGE_EDGE
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+def make_image(width: int, height: int, image_format: str = 'PNG', mode: str = 'RGB', noise: bool = False) -> bytes:
+    if noise:
+        image = Image.frombytes(mode, (width, height), os.urandom(width * height * len(mode)))
+    else:
+        image = Image.new(mode, (width, height), color='red')
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format)
+    return buffer.getvalue()
+
+
+class TestImageUtils(unittest.TestCase):
+
+    def test_non_image_is_unchanged(self):
+        self.assertEqual(shrink_image(b'%PDF-1.4', 'application/pdf'), (b'%PDF-1.4', 'application/pdf'))
+
+    def test_without_pillow_image_is_unchanged(self):
+        with patch('helpers.image_utils.Image', None):
+            self.assertEqual(shrink_image(b'png bytes', 'image/png'), (b'png bytes', 'image/png'))
+
+    def test_invalid_image_is_unchanged(self):
+        self.assertEqual(shrink_image(b'not an image', 'image/png'), (b'not an image', 'image/png'))
+
+    @unittest.skipUnless(Image, "Pillow is not installed")
+    def test_small_image_is_unchanged(self):
+        data = make_image(100, 50)
+        self.assertEqual(shrink_image(data, 'image/png'), (data, 'image/png'))
+
+    @unittest.skipUnless(Image, "Pillow is not installed")
+    def test_large_image_is_downscaled(self):
+        shrunk, media_type = shrink_image(make_image(MAX_IMAGE_EDGE * 2, MAX_IMAGE_EDGE), 'image/png')
+        self.assertEqual(media_type, 'image/png')
+        with Image.open(io.BytesIO(shrunk)) as image:
+            self.assertEqual(image.size, (MAX_IMAGE_EDGE, MAX_IMAGE_EDGE // 2))
+            self.assertEqual(image.format, 'PNG')
+
+    @unittest.skipUnless(Image, "Pillow is not installed")
+    def test_large_photo_is_reencoded_as_jpeg(self):
+        data = make_image(1000, 800, noise=True)
+        shrunk, media_type = shrink_image(data, 'image/png')
+        self.assertEqual(media_type, 'image/jpeg')
+        self.assertLess(len(shrunk), len(data))
+        with Image.open(io.BytesIO(shrunk)) as image:
+            self.assertEqual(image.size, (1000, 800))
+
+    @unittest.skipUnless(Image, "Pillow is not installed")
+    def test_reencoded_image_larger_than_original_is_not_used(self):
+        data = make_image(100, 50)
+        with patch('helpers.image_utils.JPEG_THRESHOLD_BYTES', 0):
+            self.assertEqual(shrink_image(data, 'image/png'), (data, 'image/png'))
+
+    @unittest.skipUnless(Image, "Pillow is not installed")
+    def test_large_transparent_image_keeps_format(self):
+        data = make_image(1000, 800, mode='RGBA', noise=True)
+        self.assertEqual(shrink_image(data, 'image/png'), (data, 'image/png'))
+
+    @unittest.skipUnless(Image, "Pillow is not installed")
+    def test_large_jpeg_is_decoded_at_reduced_scale(self):
+        shrunk, media_type = shrink_image(make_image(MAX_IMAGE_EDGE * 4, MAX_IMAGE_EDGE * 2, 'JPEG'), 'image/jpeg')
+        self.assertEqual(media_type, 'image/jpeg')
+        with Image.open(io.BytesIO(shrunk)) as image:
+            self.assertEqual(image.size, (MAX_IMAGE_EDGE, MAX_IMAGE_EDGE // 2))
+
+    @unittest.skipUnless(Image, "Pillow is not installed")
+    def test_exif_orientation_is_applied(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: rotate 90 degrees clockwise
+        buffer = io.BytesIO()
+        Image.new('RGB', (3000, 2000), color='red').save(buffer, format='JPEG', exif=exif)
+
+        shrunk, media_type = shrink_image(buffer.getvalue(), 'image/jpeg')
+        self.assertEqual(media_type, 'image/jpeg')
+        with Image.open(io.BytesIO(shrunk)) as image:
+            self.assertEqual(image.size, (1045, MAX_IMAGE_EDGE))
+            self.assertNotIn(0x0112, image.getexif())
+
+
+if __name__ == '__main__':
+    unittest.main()
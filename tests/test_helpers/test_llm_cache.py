@@ -0,0 +1,162 @@
+import os
+import sys
+import tempfile
+import types
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from helpers.llm_cache import LLMCache, DiskLLMCache, get_disk_cache
+
+
+class TestLLMCache(unittest.TestCase):
+
+    def test_make_key_is_stable_and_order_independent(self):
+        key1 = LLMCache.make_key(model='openai/gpt-4o', prompt='hello', file=None)
+        key2 = LLMCache.make_key(file=None, prompt='hello', model='openai/gpt-4o')
+        self.assertEqual(key1, key2)
+        self.assertNotEqual(key1, LLMCache.make_key(model='openai/gpt-4o', prompt='hello!', file=None))
+
+    def test_make_key_handles_non_json_values(self):
+        key = LLMCache.make_key(model='openai/gpt-4o', output=LLMCache, tags={'b': 1, 'a': 2})
+        self.assertEqual(key, LLMCache.make_key(model='openai/gpt-4o', output=LLMCache, tags={'b': 1, 'a': 2}))
+        self.assertEqual(len(key), 64)
+
+    def test_get_and_set(self):
+        cache = LLMCache()
+        self.assertIsNone(cache.get('missing'))
+        cache.set('key', 'value')
+        self.assertEqual(cache.get('key'), 'value')
+        self.assertEqual(len(cache), 1)
+
+    def test_evicts_least_recently_used(self):
+        cache = LLMCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')  # 'b' is now the least recently used
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+    def test_concurrent_access_from_threads(self):
+        cache = LLMCache(maxsize=8)
+
+        def use_cache(worker):
+            for i in range(2000):
+                cache.set(f'{worker}-{i % 16}', i)
+                cache.get(f'{(worker + 1) % 4}-{i % 16}')
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(use_cache, range(4)))
+
+        self.assertEqual(len(cache), 8)
+
+    def test_expired_entries_are_dropped(self):
+        cache = LLMCache(ttl_seconds=10)
+        with patch('helpers.llm_cache.time.time', return_value=1000):
+            cache.set('key', 'value')
+        with patch('helpers.llm_cache.time.time', return_value=1011):
+            self.assertIsNone(cache.get('key'))
+        self.assertEqual(len(cache), 0)
+
+    def test_clear(self):
+        cache = LLMCache()
+        cache.set('key', 'value')
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+
+class TestDiskLLMCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, 'cache', 'llm_cache')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_entries_survive_reopening(self):
+        cache = DiskLLMCache(self.path)
+        cache.set('key', {'value': 1})
+        cache.close()
+
+        reopened = DiskLLMCache(self.path)
+        self.assertEqual(reopened.get('key'), {'value': 1})
+        self.assertIsNone(reopened.get('missing'))
+        reopened.close()
+
+    def test_expired_entries_are_dropped(self):
+        cache = DiskLLMCache(self.path, ttl_seconds=10)
+        with patch('helpers.llm_cache.time.time', return_value=1000):
+            cache.set('key', 'value')
+        with patch('helpers.llm_cache.time.time', return_value=1011):
+            self.assertIsNone(cache.get('key'))
+        self.assertEqual(len(cache), 0)
+        cache.close()
+
+    def test_evicts_oldest_when_full(self):
+        cache = DiskLLMCache(self.path, maxsize=2)
+        for stored_at, key in enumerate(['a', 'b', 'c']):
+            with patch('helpers.llm_cache.time.time', return_value=1000 + stored_at):
+                cache.set(key, key)
+
+        with patch('helpers.llm_cache.time.time', return_value=1003):
+            self.assertIsNone(cache.get('a'))
+            self.assertEqual(cache.get('c'), 'c')
+        self.assertEqual(len(cache), 2)
+        cache.close()
+
+    def test_eviction_does_not_read_entries_from_disk(self):
+        cache = DiskLLMCache(self.path, maxsize=2)
+        cache.set('a', 'a')
+        cache.set('b', 'b')
+
+        with patch.object(type(cache._entries), '__getitem__', side_effect=AssertionError('read from disk')):
+            cache.set('c', 'c')
+
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get('a'))
+        cache.close()
+
+    def test_reopened_cache_evicts_oldest_stored_entry(self):
+        cache = DiskLLMCache(self.path, maxsize=2)
+        for stored_at, key in enumerate(['a', 'b']):
+            with patch('helpers.llm_cache.time.time', return_value=1000 + stored_at):
+                cache.set(key, key)
+        cache.close()
+
+        reopened = DiskLLMCache(self.path, maxsize=2)
+        with patch('helpers.llm_cache.time.time', return_value=1002):
+            reopened.set('c', 'c')
+            self.assertIsNone(reopened.get('a'))
+            self.assertEqual(reopened.get('b'), 'b')
+        reopened.close()
+
+    def test_entries_of_removed_classes_are_misses(self):
+        module = types.ModuleType('removed_output_module')
+        exec('class RemovedOutput:\n    pass', module.__dict__)
+        module.RemovedOutput.__module__ = module.__name__
+        cache = DiskLLMCache(self.path)
+        with patch.dict(sys.modules, {module.__name__: module}):
+            cache.set('removed', module.RemovedOutput())
+        cache.set('kept', 'value')
+        cache.close()
+
+        reopened = DiskLLMCache(self.path)
+        self.assertIsNone(reopened.get('removed'))
+        self.assertEqual(reopened.get('kept'), 'value')
+        self.assertEqual(len(reopened), 1)
+        reopened.close()
+
+    def test_get_disk_cache_shares_one_instance_per_file(self):
+        first = get_disk_cache(self.path)
+        second = get_disk_cache(os.path.join(self.temp_dir.name, 'cache', '..', 'cache', 'llm_cache'))
+
+        self.assertIs(first, second)
+        first.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
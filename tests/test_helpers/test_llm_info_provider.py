@@ -213,6 +213,20 @@ class TestLLMInfoProvider(unittest.TestCase):
         self.assertEqual(price_list['provider3/model_expensive']['prompt'], 0.6)
         self.assertEqual(price_list['provider3/model_expensive']['completion'], 0.8)
 
+    def test_get_price_list_categories(self):
+        provider = LLMInfoProvider()
+        completion_prices = {'cheap/below': '0.0000009', 'medium/boundary': '0.000001', 'medium/below': '0.0000039',
+                             'expensive/boundary': '0.000004'}
+        with patch.object(provider, '_get_models_data', return_value=[
+            {'id': model_id, 'pricing': {'completion': price}} for model_id, price in completion_prices.items()
+        ]):
+            price_list = provider.get_price_list()
+
+        self.assertEqual(price_list['cheap/below']['price_category'], 'cheap')
+        self.assertEqual(price_list['medium/boundary']['price_category'], 'medium')
+        self.assertEqual(price_list['medium/below']['price_category'], 'medium')
+        self.assertEqual(price_list['expensive/boundary']['price_category'], 'expensive')
+
     def test_format_price_list(self):
         provider = LLMInfoProvider()
         # Manually set the cost info
@@ -264,6 +278,47 @@ class TestLLMInfoProvider(unittest.TestCase):
         self.assertIsNotNone(info)
         self.assertEqual(info['id'], 'provider1/model_cheap') # Should resolve the alias
 
+    def test_get_model_info_reads_mappings_once(self):
+        provider = LLMInfoProvider()
+        provider._cost_info = {
+            "pydantic_model_cost": {},
+            "llm_model_cost": {},
+            "total_cost": {"total": 0},
+            "model_data": DUMMY_MODELS_DATA['data']
+        }
+        self.mock_open.reset_mock()
+
+        provider.get_model_info('alias_for_cheap')
+        info = provider.get_model_info('alias_for_cheap')
+
+        self.assertEqual(info['id'], 'provider1/model_cheap')
+        mappings_reads = [call for call in self.mock_open.call_args_list if 'model_mappings.json' in call.args[0]]
+        self.assertEqual(len(mappings_reads), 1)
+
+    def test_get_model_info_skips_excluded_and_unknown_models(self):
+        provider = LLMInfoProvider()
+
+        self.assertEqual(provider.get_model_info('provider3/model_expensive')['id'], 'provider3/model_expensive')
+        self.assertIsNone(provider.get_model_info('provider2/model_medium'))
+        self.assertIsNone(provider.get_model_info('provider9/unknown'))
+
+    def test_models_data_is_parsed_once(self):
+        provider = LLMInfoProvider()
+        self.mock_open.reset_mock()
+
+        provider.get_model_info('provider1/model_cheap')
+        models = provider.get_models()
+
+        self.assertIn('provider1/model_cheap', models)
+        self.assertNotIn('provider2/model_medium', models)
+        models_reads = [call for call in self.mock_open.call_args_list if call.args[0] == 'models.json']
+        self.assertEqual(len(models_reads), 1)
+
+    def test_get_models_include_excluded(self):
+        provider = LLMInfoProvider()
+        self.assertIn('provider2/model_medium', provider.get_models(include_excluded=True))
+        self.assertNotIn('provider2/model_medium', provider.get_models())
+
     def test_get_cost_info(self):
         provider = LLMInfoProvider()
         # Manually set the cost info
@@ -286,6 +341,32 @@ class TestLLMInfoProvider(unittest.TestCase):
         cost_non_existent = provider.get_cost_info('non_existent_model', usage)
         self.assertEqual(cost_non_existent, 0.0)
 
+    def test_get_cost_info_without_response_tokens(self):
+        provider = LLMInfoProvider()
+        usage = Usage(request_tokens=100, response_tokens=None)
+        cost = provider.get_cost_info('provider1/model_cheap', usage)
+        self.assertAlmostEqual(cost, 100 * 0.0000001, places=10)
+
+    def test_get_cost_info_prices_prompt_cache_tokens(self):
+        provider = LLMInfoProvider()
+        cached_model = {
+            "id": "provider6/model_cached",
+            "pricing": {"prompt": "0.000001", "completion": "0.000002",
+                        "input_cache_read": "0.0000001", "input_cache_write": "0.00000125"}
+        }
+
+        # 1000 request tokens of which 600 read from cache and 300 written to it
+        usage = Usage(request_tokens=1000, response_tokens=10,
+                      details={'cache_read_input_tokens': 600, 'cache_creation_input_tokens': 300})
+        with patch.object(provider, 'get_model_info', return_value=cached_model):
+            cost = provider.get_cost_info('provider6/model_cached', usage)
+        # Cost = (100 * 0.000001) + (600 * 0.0000001) + (300 * 0.00000125) + (10 * 0.000002)
+        self.assertAlmostEqual(cost, 0.000555, places=10)
+
+        # Without cache prices all request tokens are prompt tokens
+        cost_cheap = provider.get_cost_info('provider1/model_cheap', usage)
+        self.assertAlmostEqual(cost_cheap, (1000 * 0.0000001) + (10 * 0.0000002), places=10)
+
 
 if __name__ == '__main__':
     unittest.main()
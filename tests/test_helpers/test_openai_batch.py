@@ -0,0 +1,82 @@
+import json
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from pydantic import BaseModel, ValidationError
+
+from helpers.openai_batch import submit_batch, get_batch_results
+
+
+class SimpleTestModel(BaseModel):
+    field1: str
+    field2: int
+
+
+def output_line(custom_id, content=None, status_code=200, error=None):
+    body = {'choices': [{'message': {'role': 'assistant', 'content': content}}]} if status_code == 200 else \
+        {'error': {'message': 'quota exceeded'}}
+    return json.dumps({'custom_id': custom_id, 'response': {'status_code': status_code, 'body': body},
+                       'error': error})
+
+
+def finished_batch(total, output_file_id='file-out', error_file_id=None, status='completed'):
+    return SimpleNamespace(status=status, output_file_id=output_file_id, error_file_id=error_file_id,
+                           request_counts=SimpleNamespace(total=total), errors=None)
+
+
+class TestOpenAIBatch(unittest.TestCase):
+
+    def test_submit_batch_uploads_jsonl_requests(self):
+        client = MagicMock()
+        client.files.create.return_value = SimpleNamespace(id='file-in')
+        client.batches.create.return_value = SimpleNamespace(id='batch_123')
+
+        batch_id = submit_batch(client, ['first', 'second'], SimpleTestModel, 'gpt-4o-mini')
+
+        self.assertEqual(batch_id, 'batch_123')
+        filename, data = client.files.create.call_args.kwargs['file']
+        self.assertEqual(client.files.create.call_args.kwargs['purpose'], 'batch')
+        lines = [json.loads(line) for line in data.splitlines()]
+        self.assertEqual([line['custom_id'] for line in lines], ['0', '1'])
+        self.assertEqual([line['body']['messages'][0]['content'] for line in lines], ['first', 'second'])
+        self.assertEqual(lines[0]['body']['model'], 'gpt-4o-mini')
+        response_format = lines[0]['body']['response_format']
+        self.assertEqual(response_format['json_schema']['name'], 'SimpleTestModel')
+        self.assertEqual(response_format['json_schema']['schema']['required'], ['field1', 'field2'])
+        kwargs = client.batches.create.call_args.kwargs
+        self.assertEqual(kwargs['input_file_id'], 'file-in')
+        self.assertEqual(kwargs['endpoint'], '/v1/chat/completions')
+
+    def test_get_batch_results_is_none_while_running(self):
+        client = MagicMock()
+        client.batches.retrieve.return_value = SimpleNamespace(status='in_progress')
+        self.assertIsNone(get_batch_results(client, 'batch_123', SimpleTestModel))
+
+    def test_get_batch_results_parses_responses_in_prompt_order(self):
+        client = MagicMock()
+        client.batches.retrieve.return_value = finished_batch(5, error_file_id='file-err')
+        contents = {
+            'file-out': '\n'.join([output_line('2', '{"field1": "c"}'),
+                                   output_line('0', '{"field1": "a", "field2": 1}')]),
+            'file-err': output_line('1', status_code=429),
+        }
+        client.files.content.side_effect = lambda file_id: SimpleNamespace(content=contents[file_id].encode())
+
+        first, second, third, fourth, fifth = get_batch_results(client, 'batch_123', SimpleTestModel)
+
+        self.assertEqual(first, SimpleTestModel(field1='a', field2=1))
+        self.assertIsInstance(second, RuntimeError)
+        self.assertIsInstance(third, ValidationError)
+        self.assertIsInstance(fourth, RuntimeError)
+        self.assertIsInstance(fifth, RuntimeError)
+
+    def test_get_batch_results_failed_batch_raises(self):
+        client = MagicMock()
+        client.batches.retrieve.return_value = finished_batch(1, output_file_id=None, status='failed')
+        with self.assertRaises(RuntimeError):
+            get_batch_results(client, 'batch_123', SimpleTestModel)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -214,6 +214,20 @@ class TestUsageTracker(unittest.TestCase):
 
         self.assertAlmostEqual(tracker.get_usage_today(), 0.0003) # Sum of today's costs
 
+    def test_add_usage_totals_reset_on_new_day(self):
+        tracker = UsageTracker()
+        tracker.add_usage(LLMReport(model_name='model1', usage=Usage(), cost=0.0001),
+                          model_name='model1', service='s1', pydantic_model_name='P1')
+
+        self.mock_datetime.now.return_value = datetime(2023, 10, 27, 12, 0, 0)
+        tracker.add_usage(LLMReport(model_name='model1', usage=Usage(), cost=0.0002),
+                          model_name='model1', service='s1', pydantic_model_name='P1')
+        tracker.add_usage(LLMReport(model_name='model1', usage=Usage(), cost=0.0004),
+                          model_name='model1', service='s1', pydantic_model_name='P1')
+
+        self.assertAlmostEqual(tracker.usage_data.usage_today, 0.0006)
+        self.assertAlmostEqual(tracker.usage_data.usage_this_month, 0.0007)
+
     def test_calculate_usage_this_month(self):
         tracker = UsageTracker()
         # Add usage for this month (October 2023)
@@ -439,6 +453,51 @@ class TestUsageTracker(unittest.TestCase):
             # Should return formatted output for an empty HelperUsage object
             self.assertIn("OVERALL USAGE SUMMARY (COSTS)", formatted_output)
 
+    def test_add_usage_counts_repeated_tool_calls(self):
+        tracker = UsageTracker()
+        report = LLMReport(model_name='model_a', usage=Usage(), cost=0.0)
+        tracker.add_usage(report, model_name='model_a', service='service_x',
+                          tool_names_called=['tool_calc', 'tool_calc', 'tool_date'])
+        tracker.add_usage(report, model_name='model_a', service='service_x', tool_names_called=['tool_calc'])
+
+        calls = {item.tool_name: item.calls for item in tracker.usage_data.daily_tool_usage}
+        self.assertEqual(calls, {'tool_calc': 3, 'tool_date': 1})
+        self.assertEqual(len(tracker.usage_data.daily_tool_usage), 2)
+
+    def test_load_old_file_without_tool_usage(self):
+        old_content = dict(INITIAL_USAGE_CONTENT, usage_today=0.5)
+        del old_content['daily_tool_usage']
+        with open(TEST_USAGE_FILE_PATH, 'w') as f:
+            json.dump(old_content, f)
+
+        tracker = UsageTracker()
+        self.assertEqual(tracker.usage_data.usage_today, 0.5)
+        self.assertEqual(tracker.usage_data.daily_tool_usage, [])
+
+    def test_load_corrupted_file_creates_new_one(self):
+        with open(TEST_USAGE_FILE_PATH, 'w') as f:
+            f.write("{invalid json")
+
+        with self.assertLogs(level='WARNING') as logs:
+            tracker = UsageTracker()
+        self.assertEqual(len(logs.records), 1)
+        self.assertEqual(tracker.usage_data, HelperUsage())
+        with open(TEST_USAGE_FILE_PATH, 'r') as f:
+            self.assertEqual(json.load(f)['daily_usage'], [])
+
+    def test_save_expands_scientific_notation_only_in_numbers(self):
+        tracker = UsageTracker()
+        tracker.usage_data.usage_today = 1.5e-07
+        tracker.usage_data.daily_usage.append(UsageItem(day='2023-10-26', model='model-1e5', cost=-2e-06))
+        tracker._save()
+
+        with open(TEST_USAGE_FILE_PATH, 'r') as f:
+            json_str = f.read()
+        self.assertIn('"usage_today": 0.00000015', json_str)
+        self.assertIn('"cost": -0.000002', json_str)
+        self.assertIn('"model": "model-1e5"', json_str)
+        self.assertAlmostEqual(json.loads(json_str)['usage_today'], 1.5e-07)
+
 
 if __name__ == '__main__':
     unittest.main()
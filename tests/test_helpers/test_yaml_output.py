@@ -0,0 +1,56 @@
+import unittest
+from unittest.mock import patch
+
+from pydantic import BaseModel
+from pydantic_ai import ModelRetry, TextOutput
+
+from helpers.yaml_output import yaml_instructions, yaml_output
+
+
+class SimpleTestModel(BaseModel):
+    field1: str
+    field2: int
+
+
+class TestYamlOutput(unittest.TestCase):
+
+    def test_instructions_contain_schema_fields(self):
+        instructions = yaml_instructions(SimpleTestModel)
+        self.assertIn('YAML', instructions)
+        self.assertIn('field1:', instructions)
+        self.assertIn('field2:', instructions)
+
+    def test_instructions_are_built_once_per_model(self):
+        yaml_instructions.cache_clear()
+        with patch.object(SimpleTestModel, 'model_json_schema', wraps=SimpleTestModel.model_json_schema) as mock_schema:
+            first = yaml_instructions(SimpleTestModel)
+            second = yaml_instructions(SimpleTestModel)
+
+        self.assertIs(first, second)
+        mock_schema.assert_called_once()
+
+    def test_parses_plain_yaml(self):
+        output = yaml_output(SimpleTestModel)
+        self.assertIsInstance(output, TextOutput)
+        self.assertEqual(output.output_function("field1: test\nfield2: 123"), SimpleTestModel(field1='test', field2=123))
+
+    def test_parses_fenced_yaml(self):
+        parse = yaml_output(SimpleTestModel).output_function
+        self.assertEqual(parse("```yaml\nfield1: test\nfield2: 123\n```"), SimpleTestModel(field1='test', field2=123))
+        self.assertEqual(parse("```\nfield1: test\nfield2: 1\n```"), SimpleTestModel(field1='test', field2=1))
+
+    def test_parses_with_safe_loader(self):
+        parse = yaml_output(SimpleTestModel).output_function
+        with self.assertRaises(ModelRetry):
+            parse("field1: !!python/name:os.system\nfield2: 1")
+
+    def test_invalid_output_asks_for_retry(self):
+        parse = yaml_output(SimpleTestModel).output_function
+        with self.assertRaises(ModelRetry):
+            parse("field1: [unclosed")
+        with self.assertRaises(ModelRetry):
+            parse("field1: test")
+
+
+if __name__ == '__main__':
+    unittest.main()
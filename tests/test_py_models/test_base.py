@@ -0,0 +1,83 @@
+import unittest
+from typing import List, Optional
+from unittest.mock import patch
+
+from pydantic import Field, ValidationError, field_validator
+
+from py_models.base import BasePyModel
+
+
+class FilteredModel(BasePyModel):
+    name: str
+    count: int = 0
+    tags: List[str] = Field(default_factory=list)
+    score: Optional[float] = Field(default=None, ge=0)
+
+
+class ValidatedModel(BasePyModel):
+    name: str
+
+    @field_validator('name')
+    @classmethod
+    def upper_name(cls, value):
+        return value.upper()
+
+
+class TestBasePyModel(unittest.TestCase):
+
+    def test_create_filtered_drops_invalid_and_unknown_fields(self):
+        model = FilteredModel.create_filtered({
+            'name': 'test',
+            'count': 'not a number',
+            'tags': ['a', 'b'],
+            'score': -1,
+            'unknown': 'value',
+        })
+
+        self.assertEqual(model.name, 'test')
+        self.assertEqual(model.count, 0)
+        self.assertEqual(model.tags, ['a', 'b'])
+        self.assertIsNone(model.score)
+        self.assertEqual(model.model_dump(), {'name': 'test', 'count': 0, 'tags': ['a', 'b'], 'score': None})
+
+    def test_create_filtered_coerces_values(self):
+        model = FilteredModel.create_filtered({'name': 'test', 'count': '5', 'score': '1.5'})
+        self.assertEqual(model.count, 5)
+        self.assertEqual(model.score, 1.5)
+
+    def test_create_filtered_missing_required_field_raises(self):
+        with self.assertRaises(ValidationError):
+            FilteredModel.create_filtered({'name': 123, 'count': 1})
+
+    def test_create_filtered_runs_model_validators(self):
+        model = ValidatedModel.create_filtered({'name': 'test'})
+        self.assertEqual(model.name, 'TEST')
+
+    def test_create_filtered_validates_valid_data_once(self):
+        with patch.object(FilteredModel, 'model_validate', wraps=FilteredModel.model_validate) as mock_validate:
+            model = FilteredModel.create_filtered({'name': 'test', 'count': 2})
+
+        mock_validate.assert_called_once()
+        self.assertEqual(model.count, 2)
+
+    def test_create_filtered_drops_fields_failing_field_validators(self):
+        class StrictModel(BasePyModel):
+            name: str
+            code: str = 'none'
+
+            @field_validator('code')
+            @classmethod
+            def check_code(cls, value):
+                if not value.isdigit():
+                    raise ValueError('code must be numeric')
+                return value
+
+        model = StrictModel.create_filtered({'name': 'test', 'code': 'abc'})
+        self.assertEqual(model.code, 'none')
+
+    def test_create_filtered_passes_through_non_dict(self):
+        self.assertEqual(FilteredModel.create_filtered('raw'), 'raw')
+
+
+if __name__ == '__main__':
+    unittest.main()